@@ -13,6 +13,7 @@ except:
 from itertools import product
 from collections import defaultdict
 from util import Variable
+from journal import Journal
 from math import sqrt
 import random
 
@@ -21,18 +22,6 @@ from player import Bot, Player
 __all__ = ['Clymily']
 
 
-def pickleDumpDict(name, d):
-    """ pickle-dump a variable into a file """
-    try:
-        f = open(name + '.pickle', 'w')
-        pickle.dump(d, f)
-        f.close()
-        return True
-    except Exception, e:
-        # print 'Error writing into', name, ':', str(e)
-        return False
-
-
 def pickleReadDict(name):
     """ pickle-read a (default: dictionary) variable from a file """
     try:
@@ -60,9 +49,14 @@ class StatBase():
     
     name = 'logs/prob_db'
     
-    delay = 50
+    # rewrite the journal with the totals when it has more entries than this
+    compaction = 1000
     
     def __init__(self):
+        self.journal = None
+        self.clear()
+        
+    def clear(self):
         # populate with dictionaries for all useful cases
         self._data = {}
         for l in [2,3]:
@@ -80,29 +74,47 @@ class StatBase():
                     self._data[('s', isspy, team)] = defaultdict(Variable)
                 
     def load(self):
-        d1 = pickleReadDict(self.name)        
+        """ Read all the samples from the journal shared by all processes, 
+        which starts from the old pickled databases if there are any. """
+        self.journal = Journal(self.name + '.journal')
+        # Imported by only one process, even if several start together.
+        self.journal.initialize(self._imported)
+        self.update()
+        if self.journal.frames > self.compaction:
+            self.journal.compact()
+        
+    def _imported(self):
+        d1 = pickleReadDict(self.name)
         d2 = pickleReadDict(self.name + '2')
-        if len(d1) == 0:
-            d1 = self._data
-        if len(d2) == 0:
-            d2 = self._data
         l1 = sum([len(x) for x in d1.values()])
-        l2 = sum([len(x) for x in d2.values()])        
-        if l1 < l2:
-            self._data = d2
-        else:
-            self._data = d1
-        if l1 == 0:
-            self.store([0])
-        if l2 == 0:
-            self.store([1])
-        
-    def store(self, ticker=[0]):
-        if ticker[0] % self.delay == 0:
-            pickleDumpDict(self.name, self._data)
-        if ticker[0] % self.delay == 1:
-            pickleDumpDict(self.name + '2', self._data)
-        ticker[0] += 1            
+        l2 = sum([len(x) for x in d2.values()])
+        for k, d in (d1 if l1 >= l2 else d2).items():
+            for key, v in d.items():
+                yield (k, key), v.total, v.samples
+        
+    def update(self):
+        """ Add the samples stored by other processes since last time. """
+        replaced, increments = self.journal.read()
+        if replaced:
+            self.clear()
+        for (k, key), total, samples in increments:
+            if k not in self._data:
+                self._data[k] = defaultdict(Variable)
+            v = self._data[k][key]
+            v.total += total
+            v.samples += samples
+        
+    def store(self):
+        """ Append the samples of the last game to the journal, which only
+        costs as much as the number of changes. """
+        if self.journal is not None:
+            self.journal.flush()
+            self.update()
+            
+    def _sample(self, k, key, updown):
+        self._data[k][key].sample(updown)
+        if self.journal is not None:
+            self.journal.add((k, key), updown)
         
     def pprint(self):
         print "Player statistics on %s / %s topics." % (len(self._data), sum([len(x) for x in self._data.values()]))
@@ -134,13 +146,13 @@ class StatBase():
                 
     def addSampleM(self, updown, output, tsize,
                    actors, greens):
-        d = self._data[('m', tsize, len(actors), output)]
+        d = ('m', tsize, len(actors), output)
         if len(actors) == 1:
             for k in product([actors[0], None], [greens, None]):
-                d[tuple(k)].sample(updown)
+                self._sample(d, tuple(k), updown)
         else:
             for k in product([actors[0], None], [actors[1], None], [greens, None]):
-                d[tuple(k)].sample(updown)
+                self._sample(d, tuple(k), updown)
             
     def getProbM(self, output, tsize, actors, greens):
         d = self._data[('m', tsize, len(actors), output)]
@@ -151,9 +163,9 @@ class StatBase():
             
     def addSampleV(self, updown, isspy, team,
                    actor, isleader, greens, vround):
-        d = self._data[('v', isspy, team)]
+        d = ('v', isspy, team)
         for k in product([actor, None], [isleader, None], [greens, None], [vround, None]):
-            d[tuple(k)].sample(updown)
+            self._sample(d, tuple(k), updown)
     
     def getProbV(self, isspy, team, actor, isleader, greens, vround):
         d = self._data[('v', isspy, team)]
@@ -161,9 +173,9 @@ class StatBase():
         
     def addSampleC(self, updown, tsize,
                    actor, partner, isleader, greens):
-        d = self._data[('c', tsize)]
+        d = ('c', tsize)
         for k in product([actor, None],[partner, None], [isleader, None], [greens, None]):
-            d[tuple(k)].sample(updown)
+            self._sample(d, tuple(k), updown)
     
     def getProbC(self, tsize, actor, partner, isleader, greens):
         d = self._data[('c', tsize)]
@@ -171,9 +183,9 @@ class StatBase():
         
     def addSampleS(self, updown, output, isspy,
                    actor, greens, vround):
-        d = self._data[('s', isspy, output)]
+        d = ('s', isspy, output)
         for k in product([actor, None], [greens, None], [vround, None]):
-            d[tuple(k)].sample(updown)
+            self._sample(d, tuple(k), updown)
     
     def getProbS(self, output, isspy, actor, greens, vround):
         d = self._data[('s', isspy, output)]
@@ -86,14 +86,25 @@ class GrumpyBot(Bot):
         self.plan.init(game)
         self.plan.load(self.rawPlan)
 
-        self.log = logging.getLogger(str(self))
-        if not self.log.handlers:
+        self.log = self.getLog()
+
+    def onReset(self):
+        """Reused for another game, so only the plan for the new seat and role
+        is picked again."""
+        self.rawPlan = self.getPlansFor(self.index, self.spy)
+        self.plan.load(self.rawPlan)
+        self.log = self.getLog()
+
+    def getLog(self):
+        log = logging.getLogger(str(self))
+        if not log.handlers:
             try:
                 output = logging.FileHandler(filename='logs/'+str(self)+'.xml')
-                self.log.addHandler(output)
-                self.log.setLevel(logging.DEBUG)
+                log.addHandler(output)
+                log.setLevel(logging.DEBUG)
             except IOError:
                 pass
+        return log
 
     def getPlansFor(self, index, spy):
 
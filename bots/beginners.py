@@ -162,7 +162,8 @@ class Jammer(Bot):
             # Purposefully go out of our way to pick the other spy so that we
             # can trick him with deceptive sabotaging!
             self.log.info("Picking the other spy to trick them!")    
-            return list(self.spies) + random.sample(set(self.game.players) - set(self.spies), count-2)
+            spies = list(self.spies)[:2]
+            return spies + random.sample(set(self.game.players) - set(spies), count-2)
 
     def vote(self, team): 
         return True
@@ -1,15 +1,15 @@
 import random
-import inspect
-import itertools
 
 from player import Bot
-from intermediate import Simpleton
+from game import oracle
+from hypotheses import members
+from intermediates import Simpleton
 
 
 __all__ = ['RandomCheater', 'LogicalCheater']
 
 
-# RES_CHEAT_RATIO = 0.7
+RES_CHEAT_RATIO = 0.7
 RES_CORRECT_DOWNVOTE = 0.7
 RES_CORRECT_UPVOTE = 0.7
 RES_CORRECT_SELECTION = 0.7
@@ -17,14 +17,10 @@ RES_CORRECT_SELECTION = 0.7
 SPY_CHEAT_RATIO = 0.7
 
 
-def permutations(config):
-    """Returns unique elements from a list of permutations."""
-    return list(set(itertools.permutations(config)))
-
-
+@oracle
 class RandomCheater(Bot):
-    """An AI that can hack the current game implementation and cheat
-    randomly a specified percentage of the time."""
+    """An AI that is told who the spies are by the game, see `game.oracle()`,
+    and cheats randomly a specified percentage of the time."""
 
     @classmethod
     def cheat_SetRate(cls, res, spy):
@@ -33,27 +29,18 @@ class RandomCheater(Bot):
         global SPY_CHEAT_RATIO 
         SPY_CHEAT_RATIO = spy
 
-    def cheat_GetSpies(self):
-        """Grab the game state from the stack, and lookup the spies using the
-        inspection module.  This code was adapted from Tom Schaul's tests."""
-        spies = []
-        f = inspect.stack()[2]
-        for game in [v for v in f[0].f_locals.values() if hasattr(v, 'bots')]:
-            for b in game.bots:
-                spies.extend([p for p in self.players if b == p and b.spy])
-            break
-        del f
-        return set(spies)
+    def onReset(self):
+        pass
 
     def onGameRevealed(self, players, spies):
         self.players = players
-        self.spies = spies or self.cheat_GetSpies()
+        self.spies = set(spies)
 
     def getSpies(self, config):
-        return set([player for player, spy in zip(self.others(), config) if spy])
+        return set(members(self.others(), config))
 
     def getResistance(self, config):
-        return [player for player, spy in zip(self.others(), config) if not spy]
+        return members(self.others(), ~config)
 
     def correct(self):
         return random.random() <= (SPY_CHEAT_RATIO if self.spy else RES_CHEAT_RATIO)
@@ -94,16 +81,18 @@ class RandomCheater(Bot):
         return True 
 
 
+@oracle
 class LogicalCheater(Simpleton):
+    """A Simpleton that is also told who the spies are, and cheats like the
+    RandomCheater for the decisions its logic allows."""
 
-    cheat           = RandomCheater.__dict__['correct']
+    correct         = RandomCheater.__dict__['correct']
     cheat_Select    = RandomCheater.__dict__['cheat_Select']
     cheat_Vote      = RandomCheater.__dict__['cheat_Vote']
-    cheat_GetSpies  = RandomCheater.__dict__['cheat_GetSpies']
 
     def onGameRevealed(self, players, spies):
         super(LogicalCheater, self).onGameRevealed(players, spies)
-        self.spies = spies or self.cheat_GetSpies()
+        self.players = players
 
     def _vote(self, team):
         """Let the logical reasoning of Simpleton filter out the clearly bad
@@ -111,7 +100,9 @@ class LogicalCheater(Simpleton):
         return RandomCheater.__dict__['vote'](self, team) 
 
     def select(self, players, count):
-        while True:
+        # The logic may rule out every team, e.g. as a spy, so give up after a
+        # few tries and keep the last one.
+        for _ in range(10):
             team = RandomCheater.__dict__['select'](self, players, count)
             if self._acceptable(team):
                 break
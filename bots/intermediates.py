@@ -1,44 +1,31 @@
 import random
-import itertools
 
 from player import Bot
-
-
-def permutations(config):
-    """Returns unique elements from a list of permutations."""
-    return list(set(itertools.permutations(config)))
+from hypotheses import Hypotheses, members
 
 
 class Simpleton(Bot):
     """A bot that does logical reasoning based on the known spies and the
     results from the mission sabotages."""
 
+    def onReset(self):
+        # Everything is set up again once the game is revealed.
+        pass
+
     def onGameRevealed(self, players, spies):
         self.spies = spies
-        self.configurations = permutations([True, True, False, False])
+        self.configurations = Hypotheses.excluding(self.index, len(players))
 
     def getSpies(self, config):
-        assert len(config) == 4
-        assert all([type(c) is bool for c in config])
-        return [player for player, spy in zip(self.others(), config) if spy]
+        return members(self.others(), config)
 
     def getResistance(self, config):
-        assert len(config) == 4
-        assert all([type(c) is bool for c in config])
-        return [player for player, spy in zip(self.others(), config) if not spy]
-
-    def _validateSpies(self, config, team, sabotaged):
-        spies = [s for s in team if s in self.getSpies(config)]
-        return len(spies) >= sabotaged
-
-    def _validateNoSpies(self, config, team):
-        spies = [s for s in team if s in self.getSpies(config)]
-        return len(spies) == 0
+        return members(self.others(), ~config)
 
     def select(self, players, count):
         if self.configurations:
             # Pick one of the many options first, who knows...    
-            config = self._select(self.configurations)
+            config = self._select(list(self.configurations))
             # Now pick some random players with or without myself.
             return [self] + random.sample(self.getResistance(config), count - 1)
         else:
@@ -53,8 +40,7 @@ class Simpleton(Bot):
         
     def _acceptable(self, team):
         """Determine if this team is an acceptable one to vote for..."""
-        current = [c for c in self.configurations if self._validateNoSpies(c, team)]
-        return bool(len(current) > 0)
+        return bool(self.configurations.clean(team))
 
     def vote(self, team):
         if self.game.tries == 5:
@@ -75,7 +61,7 @@ class Simpleton(Bot):
 
     def onMissionComplete(self, sabotaged):
         before = len(self.configurations)
-        self.configurations = [c for c in self.configurations if self._validateSpies(c, self.game.team, sabotaged)]
+        self.configurations = self.configurations.sabotaged(self.game.team, sabotaged)
         after = len(self.configurations)
         # self.log.debug("%s: Filtered out %i configurations, %i left." % ("SPY" if self.spy else "RST", after - before, after))
         # self.log.debug("%r" % [self.getSpies(c) for c in self.configurations])
@@ -106,30 +92,28 @@ class Bounder(Simpleton):
 
         # The set of possible assignments around the table, for:
         #   - PESSIMISTIC: All teams except those 100% proven to be spies.
-        self.pessimistic = permutations([True, True, False, False])
+        self.pessimistic = Hypotheses.excluding(self.index, len(players))
         #   - OPTIMISTIC: The teams we don't suspect to be spies without guarantees.
-        self.optimistic = permutations([True, True, False, False])
+        self.optimistic = Hypotheses.excluding(self.index, len(players))
 
     def select(self, players, count):
         if self.optimistic:
-            config = random.choice(self.optimistic)
+            config = self.optimistic.choice()
         else:
             assert len(self.pessimistic) > 0
-            config = random.choice(self.pessimistic)
+            config = self.pessimistic.choice()
         return [self] + random.sample(self.getResistance(config), count-1)
 
-    def _validate(self, config, team, sabotaged, optimistic):
-        spies = [s for s in team if s in self.getSpies(config)]
+    def _validate(self, configurations, team, sabotaged, optimistic):
         if optimistic:
-            return len(spies) == sabotaged
+            return configurations.exactly(team, sabotaged)
         else:
-            return len(spies) >= sabotaged
+            return configurations.sabotaged(team, sabotaged)
 
     def vote(self, team): 
         # Determine if this is an acceptable thing to vote for...
         def acceptable(configurations, optimistic):
-            current = [c for c in configurations if self._validate(c, team, 0, optimistic)]
-            return bool(len(current) > 0)
+            return bool(self._validate(configurations, team, 0, optimistic))
 
         # Try our best-case options first, otherwise fall back...
         if self.optimistic:
@@ -143,8 +127,8 @@ class Bounder(Simpleton):
         if self.spy:
             return
 
-        self.optimistic = [c for c in self.optimistic if self._validate(c, self.game.team, sabotaged, True)]
-        self.pessimistic = [c for c in self.pessimistic if self._validate(c, self.game.team, sabotaged, False)]
+        self.optimistic = self._validate(self.optimistic, self.game.team, sabotaged, True)
+        self.pessimistic = self._validate(self.pessimistic, self.game.team, sabotaged, False)
 
     def sabotage(self):
         return True
@@ -154,6 +138,9 @@ class Logicalton(Bot):
     """Applies some simple logic rules such as not allowing teams that include a
     team who've failed a mission previously."""
 
+    def onReset(self):
+        pass
+
     def onGameRevealed(self, players, spies):
         self.players = players
         self.spies = spies
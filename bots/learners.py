@@ -2,6 +2,7 @@ import random
 from collections import defaultdict
 
 from player import Bot 
+import shared
 
 
 class Variable(object):
@@ -26,28 +27,6 @@ class Variable(object):
             return "UNKNOWN"
 
 
-class GlobalStatistics(object):
-    def __init__(self):
-        self.spy_VotesForSpy = Variable()
-        self.spy_VotesForRes = Variable()
-        self.spy_PicksSpy = Variable()
-        self.spy_PicksSelf = Variable()
-        self.res_VotesForSpy = Variable()
-        self.res_VotesForRes = Variable()
-        self.res_PicksSpy = Variable()
-        self.res_PicksSelf = Variable()
-        self.spy_Sabotage = Variable()
-
-    def __repr__(self):
-        return """
-As Spy, VOTES:  Spy %s  Res  %s
-        PICKS:  Spy %s  Self %s
-        SABOTAGE    %s
-As Res, VOTES:  Spy %s  Res  %s
-        PICKS:  Spy %s  Self %s
-""" % (self.spy_VotesForSpy, self.spy_VotesForRes, self.spy_PicksSpy, self.spy_PicksSelf, self.spy_Sabotage, self.res_VotesForSpy, self.res_VotesForRes, self.res_PicksSpy, self.res_PicksSelf)
-
-
 class LocalStatistics(object):
     def __init__(self):
         self.probability = Variable()
@@ -60,7 +39,9 @@ class LocalStatistics(object):
 
 class Statistician(Bot):
 
-    global_statistics = defaultdict(GlobalStatistics)
+    # Behavior of each player by role, shared by all the processes of the
+    # competition, keyed by (name, attribute).
+    global_statistics = shared.Statistics('Statistician')
 
     def onGameRevealed(self, players, spies):
         self.spies = spies
@@ -78,7 +59,7 @@ class Statistician(Bot):
         team = [p for p in players if p.index == self.index]
         while len(team) < count:
             candidates = [p for p in players if p not in team]
-            team.append(self._roulette(zip(candidates, [1.0 - self._estimate(p) for p in candidates])))
+            team.append(self._roulette(list(zip(candidates, [1.0 - self._estimate(p) for p in candidates]))))
         return team
 
     def _roulette(self, candidates):
@@ -228,11 +209,11 @@ class Statistician(Bot):
                         self.store(p, 'res_VotesForRes', int(v))
 
     def store(self, player, attribute, value):
-        self.global_statistics[player.name].__dict__[attribute].sample(value)
+        self.global_statistics.sample((player.name, attribute), value)
 
     def fetch(self, player, attributes):
         result = 0.0
         for a in attributes:
-            result += self.global_statistics[player.name].__dict__[a].estimate()
+            result += self.global_statistics.estimate((player.name, a))
         return result / float(len(attributes))
 
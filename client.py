@@ -45,6 +45,7 @@ class ResistanceClient(object):
         self.game = None
         self.logger = None
         self.sender = None
+        self.spies = {}
 
     def getBot(self):
         return self.bots.get(self.channel, None)
@@ -84,7 +85,7 @@ class ResistanceClient(object):
         if spies:
             for s in spies.split(' ')[1:]:
                 saboteurs.add(self.makePlayer(s.rstrip(',')))
-            bot.game.spies = saboteurs
+            self.spies[self.channel] = saboteurs
 
         bot.onGameRevealed(participants, saboteurs)
 
@@ -156,7 +157,7 @@ class ResistanceClient(object):
         bot = self.getBot()
 
         w = bool(result.split(' ')[1] == 'Yes')
-        s = self.makeTeam(spies) if spies else bot.game.spies
+        s = self.makeTeam(spies) if spies else self.spies.pop(self.channel, set())
 
         bot.onGameComplete(w, s)
         self.protocol.part(self.channel)
@@ -5,148 +5,721 @@ from __future__ import print_function
 import multiprocessing
 import collections
 import itertools
+import array
 import importlib
+import inspect
+import types
+import copy
 import random
 import math
+import time
 import sys
 import os
 
 from player import Bot
-from game import Game
-from util import Variable
-
-
-class CompetitionStatistics:
-    def __init__(self):
-        self.resWins = Variable()
-        self.spyWins = Variable()
-        self.resVotesRes = Variable()
-        self.resVotesSpy = Variable()
-        self.spyVotesRes = Variable()
-        self.spyVotesSpy = Variable()
-        self.spyVoted = Variable()
-        self.resVoted = Variable()
-        self.spySelected = Variable()
-        self.resSelected = Variable()
-        self.spySelection = Variable()
-        self.resSelection = Variable()
+from game import Game, Budget, BudgetExceeded, Rules
+from util import Variable, Latency
+from record import GameRecord, Encoder, RecordWriter
+import logger
+import shared
 
+try:
+    from math import gcd
+except ImportError:
+    from fractions import gcd
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Columns of the statistics table, each metric stored as (total, samples).
+RES_WINS, SPY_WINS, RES_VOTES_RES, RES_VOTES_SPY, SPY_VOTES_RES, SPY_VOTES_SPY,   \
+SPY_VOTED, RES_VOTED, SPY_SELECTED, RES_SELECTED, SPY_SELECTION, RES_SELECTION,  \
+TIMEOUTS = range(0, 26, 2)
+
+
+class Counter(Variable):
+    """Variable stored as two counters in the statistics table, so that
+    sampling it or adding to it updates the table."""
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+        self.minimum = +sys.maxsize - 1
+        self.maximum = -sys.maxsize + 1
+
+    @property
     def total(self):
+        return self.table.counters[self.index]
+
+    @total.setter
+    def total(self, value):
+        self.table.counters[self.index] = value
+
+    @property
+    def samples(self):
+        return self.table.counters[self.index+1]
+
+    @samples.setter
+    def samples(self, value):
+        self.table.counters[self.index+1] = value
+
+
+class Metric(object):
+    """Accessor for one metric in a row of the statistics table, which returns
+    the counters as a Variable that writes back into the table."""
+
+    def __init__(self, column):
+        self.column = column
+
+    def __get__(self, stats, owner):
+        if stats is None:
+            return self
+        return Counter(stats.table, stats.offset + self.column)
+
+    def __set__(self, stats, variable):
+        c, i = stats.table.counters, stats.offset + self.column
+        c[i], c[i+1] = variable.total, variable.samples
+
+
+class CompetitionStatistics(object):
+    """View on the statistics of a single bot, stored in one row of the
+    table of counters for the whole competition."""
+
+    resWins = Metric(RES_WINS)
+    spyWins = Metric(SPY_WINS)
+    resVotesRes = Metric(RES_VOTES_RES)
+    resVotesSpy = Metric(RES_VOTES_SPY)
+    spyVotesRes = Metric(SPY_VOTES_RES)
+    spyVotesSpy = Metric(SPY_VOTES_SPY)
+    spyVoted = Metric(SPY_VOTED)
+    resVoted = Metric(RES_VOTED)
+    spySelected = Metric(SPY_SELECTED)
+    resSelected = Metric(RES_SELECTED)
+    spySelection = Metric(SPY_SELECTION)
+    resSelection = Metric(RES_SELECTION)
+    timeouts = Metric(TIMEOUTS)
+
+    def __init__(self, table, offset):
+        self.table = table
+        self.offset = offset
+
+    def sample(self, column, value):
+        self.table.sample(self.offset + column, value)
+
+    def total(self):
+        c, i = self.table.counters, self.offset
         return Variable(
-                self.resWins.total + self.spyWins.total,
-                self.resWins.samples + self.spyWins.samples
+                c[i+RES_WINS] + c[i+SPY_WINS],
+                c[i+RES_WINS+1] + c[i+SPY_WINS+1]
         )
 
+
+class StatisticsTable(object):
+    """Columnar store for the statistics of all bots in a competition, with a
+    fixed-width row of counters for each bot in one flat array.  Tables from
+    different games or workers are merged with a single vectorized addition if
+    numpy is available, and the array is compact to send between processes."""
+
+    WIDTH = 26
+
+    def __init__(self, names=()):
+        self.names = []
+        self.rows = {}
+        self.counters = array.array('d')
+        for name in names:
+            self.row(name)
+
+    def row(self, name):
+        """Return the offset of the row for this bot, adding it if needed."""
+        offset = self.rows.get(name)
+        if offset is None:
+            offset = len(self.counters)
+            self.rows[name] = offset
+            self.names.append(name)
+            self.counters.extend(array.array('d', [0.0]) * self.WIDTH)
+        return offset
+
+    def sample(self, index, value):
+        c = self.counters
+        c[index] += value
+        c[index+1] += 1
+
+    def __getitem__(self, name):
+        return CompetitionStatistics(self, self.row(name))
+
+    def get(self, name, default = None):
+        if name not in self.rows:
+            return default
+        return CompetitionStatistics(self, self.rows[name])
+
+    def __contains__(self, name):
+        return name in self.rows
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def items(self):
+        return [(name, CompetitionStatistics(self, self.rows[name])) for name in self.names]
+
+    def scaled(self, factor):
+        """Copy of the table with all the counters multiplied by a factor, e.g.
+        to weight the results of some games more than others."""
+        table = StatisticsTable(self.names)
+        table.counters = array.array('d', [c * factor for c in self.counters])
+        return table
+
+    @classmethod
+    def weighted(cls, tables, weights):
+        """Table of the results of several tables, where the rate of each
+        metric is their average weighted by these factors, e.g. so that each
+        lineup of bots counts the same.  The number of samples is still the
+        number of games actually played, so the confidence intervals are
+        not distorted by the weights."""
+        scaled, table = cls(), cls()
+        for t, w in zip(tables, weights):
+            scaled += t.scaled(w)
+            table += t
+        # Both tables have the same rows, added in the same order.
+        for i in range(0, len(table.counters), 2):
+            samples = scaled.counters[i+1]
+            table.counters[i] = scaled.counters[i] / samples * table.counters[i+1] if samples else 0.0
+        return table
+
     def __iadd__(self, other):
-        for k, v in self.__dict__.items():
-            v += other.__dict__[k]
+        rows = [self.row(name) // self.WIDTH for name in other.names]
+        if not rows:
+            return self
+
+        if numpy is not None:
+            a = numpy.frombuffer(self.counters).reshape(-1, self.WIDTH)
+            b = numpy.frombuffer(other.counters).reshape(-1, self.WIDTH)
+            if rows == list(range(len(rows))):
+                a[:len(rows)] += b
+            else:
+                a[rows] += b
+            del a, b
+        else:
+            for r, row in enumerate(rows):
+                for i in range(self.WIDTH):
+                    self.counters[row * self.WIDTH + i] += other.counters[r * self.WIDTH + i]
         return self
 
 
 class CompetitionRound(Game):
 
-    def __init__(self, *args):
-        super(CompetitionRound, self).__init__(*args)
-        self.statistics = collections.defaultdict(CompetitionStatistics)
+    def __init__(self, *args, **kwargs):
+        # Rounds played in batches share the same table of statistics.
+        statistics = kwargs.pop('statistics', None)
+        record = kwargs.pop('record', None)
+        super(CompetitionRound, self).__init__(*args, **kwargs)
+        self.prepare(statistics, record)
+
+    def reset(self, roles, seating=None, statistics=None, record=None):
+        super(CompetitionRound, self).reset(roles, seating)
+        self.prepare(statistics, record)
+
+    def prepare(self, statistics, record):
+        self.statistics = statistics if statistics is not None else StatisticsTable()
+        self.offsets = [self.statistics.row(b.name) for b in self.bots]
+
+        # Optionally store everything that happens in a GameRecord.
+        self.record = record
+        if record is not None:
+            record.players = [b.name for b in self.bots]
+            record.spies = sum([1 << b.index for b in self.bots if b.spy])
 
     def onPlayerVoted(self, player, vote, leader, team):
-        s = self.statistics[player.name]
+        s = self.statistics
+        o = self.offsets[player.index]
 
         spies = [t for t in team if t.spy]
         if player.spy:
             # When there are spies, we expect support.
             if spies:    
-                s.spyVotesRes.sample(int(vote))
+                s.sample(o + SPY_VOTES_RES, int(vote))
             # For missions without spies, we expect down vote.
             else:
-                s.spyVotesSpy.sample(int(not vote))
+                s.sample(o + SPY_VOTES_SPY, int(not vote))
             return
 
         # When there are no spies, we expect support.
         if not spies:    
-            s.resVotesRes.sample(int(vote))
+            s.sample(o + RES_VOTES_RES, int(vote))
         # For missions with spies, we expect down vote.
         else:
-            s.resVotesSpy.sample(int(not vote))
+            s.sample(o + RES_VOTES_SPY, int(not vote))
 
         # Everyone on the mission hopes to be approved.
         for p in team:
-            s = self.statistics[p.name]
+            o = self.offsets[p.index]
             if p.spy:
-                s.spyVoted.sample(int(vote))
+                s.sample(o + SPY_VOTED, int(vote))
             else:
-                s.resVoted.sample(int(vote))
+                s.sample(o + RES_VOTED, int(vote))
    
     def onPlayerSelected(self, player, team):
         # TODO: Detailed statistics indicating selection by each other
         # player, and whether or not the other is playing as spy.
         spies = [t for t in team if t.spy]
         
-        s = self.statistics[player.name]
+        s = self.statistics
+        o = self.offsets[player.index]
         if player.spy:
-            s.spySelection.sample(int(len(spies) > 0))
+            s.sample(o + SPY_SELECTION, int(len(spies) > 0))
         else:
-            s.resSelection.sample(int(len(spies) == 0))
+            s.sample(o + RES_SELECTION, int(len(spies) == 0))
 
         for bot in self.bots:
-            s = self.statistics[bot.name]
+            o = self.offsets[bot.index]
             if bot.spy:
-                s.spySelected.sample(int(bot in team))
+                s.sample(o + SPY_SELECTED, int(bot in team))
+            else:
+                s.sample(o + RES_SELECTED, int(bot in team))
+
+    def onVoteComplete(self, votes):
+        if self.record is not None:
+            self.record.vote(self.state)
+
+    def onMissionComplete(self, sabotaged):
+        super(CompetitionRound, self).onMissionComplete(sabotaged)
+        if self.record is not None:
+            self.record.mission(sabotaged)
+
+    def onAnnouncement(self, player, announcement):
+        super(CompetitionRound, self).onAnnouncement(player, announcement)
+        if self.record is not None:
+            self.record.announce(player, announcement)
+
+    def onGameComplete(self, win, spies):
+        if self.record is not None:
+            self.record.complete(win)
+        for b in self.bots:
+            o = self.offsets[b.index]
+            if b.spy:
+                self.statistics.sample(o + SPY_WINS, int(not win))
             else:
-                s.resSelected.sample(int(bot in team))
+                self.statistics.sample(o + RES_WINS, int(win))
+            self.statistics.sample(o + TIMEOUTS, 0)
 
+    def onGameAborted(self, error):
+        # Statistics from earlier in the game are kept, but nobody wins.
+        for b in self.bots:
+            self.statistics.sample(self.offsets[b.index] + TIMEOUTS, int(b.index == error.index))
 
-def setup():
+
+class Snapshot(object):
+    """Copy of the learned state of some bots, i.e. the data stored in the
+    attributes of their classes and the globals of their modules, which can be
+    restored later so the bots forget what they learned since.  State that the
+    bots store elsewhere, e.g. in files, is not affected."""
+
+    # Attributes that are part of the code rather than the state.
+    CLASSES = (type, types.ClassType) if hasattr(types, 'ClassType') else (type,)
+    SKIPPED = CLASSES + (types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                         staticmethod, classmethod, property)
+
+    def __init__(self, competitors = ()):
+        owners = {}
+        for bot in competitors:
+            for cls in inspect.getmro(bot):
+                if cls in (Bot, object):
+                    continue
+                owners[id(cls)] = cls
+                module = sys.modules.get(cls.__module__)
+                if module is not None:
+                    owners[id(module)] = module
+        # Also the other classes of those modules, e.g. for models of players.
+        for module in [m for m in owners.values() if isinstance(m, types.ModuleType)]:
+            for value in list(vars(module).values()):
+                if isinstance(value, self.CLASSES) and value.__module__ == module.__name__:
+                    owners[id(value)] = value
+
+        # Values are copied with the same memo so they can still share objects.
+        self.entries, memo = [], {}
+        for owner in owners.values():
+            for name, value in list(vars(owner).items()):
+                if name.startswith('__') or isinstance(value, self.SKIPPED):
+                    continue
+                try:
+                    self.entries.append((owner, name, copy.deepcopy(value, memo)))
+                except Exception:
+                    pass
+
+    def restore(self):
+        memo = {}
+        for owner, name, value in self.entries:
+            setattr(owner, name, copy.deepcopy(value, memo))
+
+
+# State of the bots in this worker as first imported, and the version of the
+# settings of the pool that it was last updated to, see `WorkerPool`.
+snapshot = Snapshot()
+version = 0
+
+
+def setup(level = logger.level, competitors = ()):
+    global snapshot
     import signal
     signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logger.configure(level)
+    snapshot = Snapshot(competitors)
 
 
-def play(args):
-    (players, roles) = args
-    g = CompetitionRound(players, roles)
-    g.channel = None
-    g.run()
+def call(update, function, args):
+    """Call a function in a worker of a `WorkerPool`, after restoring the
+    state of the bots and configuring them if the pool was updated since."""
+    global version
+    if update[0] != version:
+        count, restore, settings = update
+        if restore:
+            snapshot.restore()
+            shared.reset()
+        if settings is not None:
+            settings[0](*settings[1])
+        version = count
+    return function(*args)
 
-    for b in g.bots:
-        s = g.statistics.get(b.name)
-        if b.spy:
-            s.spyWins.sample(int(not g.won))
-        else:
-            s.resWins.sample(int(g.won))
+
+class WorkerPool(object):
+    """Pool of worker processes that stays running for successive competitions,
+    so the bots are only imported once.  What the bots learn is either kept
+    from one competition to the next if `keep` is set, or reset before each
+    competition as if the workers were started again."""
+
+    def __init__(self, competitors, processes = None, keep = False):
+        self.competitors = list(competitors)
+        self.processes = processes or multiprocessing.cpu_count()
+        self.keep = keep
+        self.settings = None
+        # Number of updates, whether the state must be restored, and settings.
+        self.version = (0, False, None)
+        self.pool = self.start()
+
+    def start(self):
+        return multiprocessing.Pool(self.processes, setup, (logger.level, self.competitors))
+
+    def update(self, restore):
+        self.version = (self.version[0] + 1, restore, self.settings)
+
+    def reset(self):
+        """Restore the state of the bots in all the workers before their next
+        games, as it was when the bots were imported."""
+        self.update(True)
+
+    def configure(self, function, *args):
+        """Call `function(*args)` in all the workers before their next games,
+        and again after each reset, e.g. to change the settings of a bot.  The
+        function must be defined at the top level of a module."""
+        self.settings = (function, args)
+        self.update(False)
+
+    def apply_async(self, function, args = ()):
+        return self.pool.apply_async(call, (self.version, function, args))
+
+    def terminate(self):
+        """Replace all the workers, which start again from the state of the
+        bots as imported, with the current settings."""
+        self.pool.terminate()
+        self.pool = self.start()
+
+    def close(self):
+        self.pool.close()
+
+    def join(self):
+        self.pool.join()
+
+
+def play(args, statistics = None, profile = None, budget = None, records = None, games = None):
+    """Play one game, and return the statistics.  If a bot runs out of time
+    the game is aborted and the BudgetExceeded error is raised.  The game is
+    also written to the `records` if specified, even if it was aborted.
+
+    The games played are kept in the `games` dictionary if specified, so the
+    next game with the same lineup reuses the same game and bots, see
+    `Game.reset()`, rather than creating them all again."""
+    (players, roles, validate, seed) = args
+    # Each game has its own random seed so it can be replayed exactly.
+    if seed is not None:
+        random.seed(seed)
+    record = GameRecord(seed) if records is not None else None
+    key = tuple(sorted(players, key = id))
+    g = games.pop(key, None) if games is not None else None
+    if g is None:
+        g = CompetitionRound(players, roles, None, validate, profile, budget, statistics = statistics, record = record)
+    else:
+        g.reset(roles, seating(g.bots, players), statistics = statistics, record = record)
+        g.validate = validate
+    g.channel = None
+    try:
+        g.run()
+    except BudgetExceeded as e:
+        # The bots may be left in an inconsistent state, so aren't reused.
+        g.onGameAborted(e)
+        raise
+    finally:
+        if record is not None:
+            records.write(record)
+    if games is not None:
+        games[key] = g
     return g.statistics
 
 
+def seating(bots, players):
+    """Current index of one of the bots for each seat, so they're placed in
+    the same order as the classes of the players."""
+    available = list(bots)
+    result = []
+    for p in players:
+        b = [b for b in available if type(b) is p][0]
+        available.remove(b)
+        result.append(b.index)
+    return result
+
+
+def lineupKey(players):
+    """Key for the lineup of bots in a game, regardless of seats and roles."""
+    return tuple(sorted([p.__name__ for p in players]))
+
+
+def play_batch(batch, profile = False, budget = None, record = False, split = False, server = None):
+    """Play a chunk of games in a worker process, accumulating the results
+    into one table so it's sent back to the runner only once, or one table
+    per lineup if `split` is set.  Also returns the number of games and the
+    time taken to help pick the next chunk size, the timings of the bots if
+    profiling, the error if a game was aborted, and the encoded records of
+    the games if requested.  What the bots learn is shared between games
+    with the other workers through the `server`, if specified.
+
+    The bots may be left in an inconsistent state after a timeout, so the
+    rest of the chunk is not played in this process."""
+    t = time.time()
+    statistics = {} if split else StatisticsTable()
+    timings = collections.defaultdict(Latency) if profile else None
+    records = Encoder() if record else None
+    count, error = 0, None
+    # Games by lineup that are reused for the rest of the chunk.
+    games = {}
+    if server is not None:
+        shared.connect(server)
+    for args in batch:
+        count += 1
+        table = statistics
+        if split:
+            table = statistics.setdefault(lineupKey(args[0]), StatisticsTable())
+        try:
+            play(args, table, timings, budget, records, games)
+        except BudgetExceeded as e:
+            error = e
+            break
+        finally:
+            if server is not None:
+                shared.update()
+    if server is not None:
+        shared.synchronize()
+    return count, time.time() - t, statistics, timings, error, records.take() if records else None
+
+
 class CompetitionRunner(object):
 
-    def __init__(self, competitors, rounds, quiet = False):
+    # Number of fully validated games to play before trusting the bots.
+    WARMUP_GAMES = 100
+
+    # Target duration in seconds of a chunk of games sent to a worker, and the
+    # maximum number of games in a chunk.
+    BATCH_TIME = 0.1
+    BATCH_SIZE = 1000
+
+    # Minimum number of games for each bot before its rank can be settled.
+    ADAPTIVE_GAMES = 100
+
+    # Master seeds have 31 bits, so the seed of each game, with the index of
+    # the game in the low 32 bits, fits in a record and is never NO_SEED.
+    SEEDS = 2**31
+
+    # Fraction of the permutations skipped between consecutive games.
+    SPREAD = 0.618
+
+    def __init__(self, competitors, rounds, quiet = False, validate = True, seed = None, profile = False,
+                 budget = None, record = None, adaptive = False, lineups = None, pool = None, shared = None,
+                 players = 5):
         self.rounds = rounds
         self.quiet = quiet
-        self.statistics = collections.defaultdict(CompetitionStatistics)
+        self.validate = validate
+        # Timings of all calls to the bots, by bot and function, if profiling.
+        self.profile = collections.defaultdict(Latency) if profile else None
+        # Master seed from which the schedule and the seeds for each game are
+        # derived, which makes it possible to replay any game on its own.
+        self.seed = seed if seed is not None else random.randrange(self.SEEDS)
+        if not 0 <= self.seed < self.SEEDS:
+            raise ValueError("The seed must be between 0 and %i." % (self.SEEDS - 1))
+        # Time limits for the bots in each game, or None.
+        self.budget = budget
+        # Filename where all the games are recorded, or None.
+        self.record = record
+        # Stop early once the ranking is settled, and focus on the close bots.
+        self.adaptive = adaptive
+        # Dictionary where the results are also accumulated per lineup, see
+        # `lineupKey()`, e.g. to reuse them in later competitions, or None.
+        self.lineups = lineups
+        # Pool of workers that's kept for other competitions, see `WorkerPool`,
+        # or None to start new processes for this one.
+        self.pool = pool
+        # Server where the learning bots share their statistics across all the
+        # workers, see `shared.Server`, or None to learn in each separately.
+        self.shared = shared
+        # Rules for the number of players in each game, from 5 to 10.
+        self.rules = Rules.get(players)
+        self.statistics = StatisticsTable()
+        # Number of games dropped because a worker stopped responding.
+        self.skipped = 0
 
         # Make sure there are sufficient entrants if necessary.
         # WARNING: Results in multiple bot instances per game!
         self.competitors = competitors
-        while competitors and len(self.competitors) < 5:
+        while competitors and len(self.competitors) < players:
             self.competitors.extend(competitors)
 
-    def listGameSelections(self):
+    def listGameSelections(self, competitors = None, rounds = None, seed = None):
         """Evaluate all bots in all possible permutations!  If there are more
-        games requested, randomly fill up from a next round of permutations."""
-        if not self.competitors: raise StopIteration 
-
-        p = []
-        r = set(itertools.permutations([True, True, False, False, False]))
-        for players in itertools.permutations(self.competitors, 5):
-            for roles in r:
-                p.append((players, roles))
-
-        permutations = []
-        while len(permutations) < self.rounds:
-            random.shuffle(p)
-            permutations.extend(p)
-        
-        for players, roles in permutations[:self.rounds]:
-            yield (players, roles)
+        games requested, randomly fill up from a next round of permutations.
+
+        The permutations are not stored, but generated on demand by walking
+        over their indices in a random order: each round maps the indices with
+        a random bijection `(a * i + b) % total`, which covers every pairing of
+        players and roles exactly once, in constant memory.  The multiplier is
+        coprime to the total and close to `total * SPREAD`, so that the games of
+        a partial round are scattered over all the permutations.
+
+        By default all the competitors play all the rounds, but the games can
+        also be listed for a subset of them."""
+        competitors = competitors or self.competitors
+        rounds = self.rounds if rounds is None else rounds
+        if not competitors: return
+
+        roles = self.rules.roles
+        total = len(roles)
+        for n in range(len(competitors) - self.rules.players + 1, len(competitors) + 1):
+            total *= n
+
+        rng = random.Random(self.seed if seed is None else seed)
+        count = 0
+        while count < rounds:
+            # A multiplier near the golden ratio spreads consecutive indices
+            # evenly, so that a partial round still samples all the lineups.
+            a = int(total * self.SPREAD) + rng.randrange(max(1, total // 32))
+            while gcd(a, total) != 1:
+                a += 1
+            b = rng.randrange(total)
+
+            for i in range(min(total, rounds - count)):
+                index, r = divmod((a * i + b) % total, len(roles))
+                yield (self.unrankPlayers(index, competitors), roles[r])
+            count += total
+
+    def unrankPlayers(self, index, competitors = None):
+        """Convert an index into the corresponding selection of players,
+        using each seat as one digit in a mixed-radix number."""
+        candidates = list(competitors or self.competitors)
+        players = []
+        for _ in range(self.rules.players):
+            index, d = divmod(index, len(candidates))
+            players.append(candidates.pop(d))
+        return tuple(players)
+
+    def gameSeed(self, index):
+        """Random seed for the game at this index in the schedule."""
+        return (self.seed << 32) | index
+
+    def listGames(self, competitors = None, rounds = None, start = 0):
+        """All the games of the competition as arguments for `play()`, or only
+        those of some competitors from the game at index `start` onwards."""
+        seed = self.gameSeed(start) if start else None
+        for i, (players, roles) in enumerate(self.listGameSelections(competitors, rounds, seed)):
+            yield (players, roles, self.validate, self.gameSeed(start + i))
+
+    def unsettled(self):
+        """Names of the bots whose rank is not settled yet, because they have
+        played too few games or the confidence interval of their score overlaps
+        with that of the bot ranked just above or below."""
+        names = set([c.__name__ for c in self.competitors if c.__name__ not in self.statistics])
+        results = sorted([(s.total(), name) for name, s in self.statistics.items()],
+                         key = lambda x: x[0].value(), reverse = True)
+        for i, (v, name) in enumerate(results):
+            if v.samples < self.ADAPTIVE_GAMES:
+                names.add(name)
+            for w, _ in results[max(i-1, 0):i] + results[i+1:i+2]:
+                if abs(v.value() - w.value()) <= v.error() + w.error():
+                    names.add(name)
+        return names
+
+    def lineup(self, names):
+        """Competitors for the next games in adaptive mode: the bots with these
+        names, and the bots closest to them in the ranking to fill games."""
+        ranking = sorted(set(self.competitors), key = lambda c: self.statistics[c.__name__].total().value()
+                         if c.__name__ in self.statistics else 0.5, reverse = True)
+        ranks = [i for i, c in enumerate(ranking) if c.__name__ in names]
+        if not ranks:
+            return []
+
+        chosen = [c for c in ranking if c.__name__ in names]
+        others = sorted([c for c in ranking if c.__name__ not in names],
+                        key = lambda c: min([abs(ranking.index(c) - r) for r in ranks]))
+        seats = self.rules.players
+        chosen.extend(others[:max(0, seats - len(chosen))])
+        while len(chosen) < seats:
+            chosen.extend(chosen[:seats - len(chosen)])
+        return chosen
+
+    def warmup(self):
+        """Play a sample of games with full validation of the data returned by
+        the bots, which raises an AssertionError if a bot misbehaves.  The
+        results of these games are not counted in the statistics, and what the
+        bots learn from them is forgotten, see `Snapshot`, so the workers
+        forked afterwards start from the same state as without a warm-up."""
+        rng = random.Random(self.seed)
+        selections = []
+        while self.competitors and len(selections) < self.WARMUP_GAMES:
+            players = rng.sample(self.competitors, self.rules.players)
+            roles = rng.choice(self.rules.roles)
+            selections.append((players, roles, rng.getrandbits(63)))
+
+        state, learned = random.getstate(), Snapshot(self.competitors)
+        try:
+            for players, roles, seed in selections:
+                play((players, roles, True, seed))
+        finally:
+            learned.restore()
+            random.setstate(state)
+
+    def patience(self, games):
+        """Maximum time in seconds to wait for a chunk of games from a worker,
+        after which it's assumed to be stuck somewhere that can't be interrupted
+        by the budget.  This is deliberately generous."""
+        if self.budget is None:
+            return None
+        if self.budget.game is not None:
+            limit = 5 * self.budget.game
+        else:
+            limit = 1000 * self.budget.call
+        return 2.0 * games * limit + 60.0
+
+    def createPool(self):
+        """Pool of worker processes where the games are played."""
+        if self.pool is not None:
+            return self.pool
+        return multiprocessing.Pool(multiprocessing.cpu_count(), setup, (logger.level,))
+
+    def capacity(self, pool):
+        """Number of chunks of games that the pool can play in parallel."""
+        if self.pool is not None:
+            return max(1, self.pool.processes)
+        return multiprocessing.cpu_count()
 
     def main(self):
         names = [bot.__name__ for bot in self.competitors]
@@ -155,23 +728,122 @@ class CompetitionRunner(object):
                 bot.onCompetitionStarting(names)
 
         if not self.quiet:
-            print("Running competition with %i bots." % (len(self.competitors)), file=sys.stderr)
+            print("Running competition with %i bots (seed %i)." % (len(self.competitors), self.seed), file=sys.stderr)
+
+        # Trusted bots are validated once in this process, then run lean.
+        if not self.validate:
+            self.warmup()
 
         def output(text):
             sys.stdout.write(text)
             sys.stdout.flush()
 
-        pool = multiprocessing.Pool(multiprocessing.cpu_count(), setup)
-        # pool = itertools
-        for i, stats in enumerate(pool.imap(play, self.listGameSelections())):
-            for p, s in stats.items():
-                self.statistics[p] += s
+        if self.pool is not None and not self.pool.keep:
+            self.pool.reset()
+        pool = self.createPool()
+        games = self.listGames()
+
+        # Workers encode the games they play, which are appended as they come.
+        records = RecordWriter(self.record) if self.record else None
+
+        def submit(batch):
+            args = (batch, self.profile is not None, self.budget, records is not None, self.lineups is not None,
+                    self.shared.address if self.shared is not None else None)
+            pending.append((batch, pool.apply_async(play_batch, args)))
 
-            if not self.quiet:
-                if (i+1) % 500 == 0:  output('(%02i%%)\n' % (100*(i+1)/self.rounds))
-                elif (i+1) % 125 == 0: output('O')
-                elif (i+1) %  25 == 0: output('o')
-                elif (i+1) %  5 == 0: output('.')
+        # Keep a few chunks queued per worker, and size the next ones based on
+        # the time measured per game so far.
+        i, size, remaining = 0, 1, self.rounds
+        lineup = self.competitors
+        pending = collections.deque()
+        while True:
+            # Only list the next games for the bots whose rank isn't settled,
+            # which may already be the case given previous results.
+            if self.adaptive and remaining > 0:
+                selected = self.lineup(self.unsettled())
+                if not selected:
+                    if not self.quiet:
+                        print("\nRanking settled after %i games." % i, file=sys.stderr)
+                    games, remaining = iter(()), 0
+                elif sorted(selected, key = id) != sorted(lineup, key = id):
+                    lineup = selected
+                    games = self.listGames(lineup, remaining, self.rounds - remaining)
+
+            processes = self.capacity(pool)
+            while len(pending) < 2 * processes:
+                batch = list(itertools.islice(games, max(1, min(size, remaining // (2 * processes)))))
+                if not batch:
+                    break
+                remaining -= len(batch)
+                submit(batch)
+            if not pending:
+                break
+
+            batch, result = pending.popleft()
+            try:
+                count, elapsed, stats, timings, error, segment = result.get(self.patience(len(batch)))
+            except multiprocessing.TimeoutError:
+                # The games of the chunk are not played again, in case they hang
+                # the next worker too, but the shortfall is reported.
+                print("\nSkipped %i games after a worker stopped responding." % len(batch), file=sys.stderr)
+                self.skipped += len(batch)
+                count, elapsed, stats, timings, error, segment = 0, None, None, None, None, None
+                batch = []
+
+            if stats is None or error is not None:
+                # Replace all the workers, since they may be stuck or the bots
+                # corrupted, then play the queued chunks again in new workers.
+                pool.terminate()
+                pool = self.createPool()
+                queued = [batch[count:]] + [b for b, _ in pending]
+                pending.clear()
+                for b in queued:
+                    if b:
+                        submit(b)
+
+            if stats is not None and self.lineups is not None:
+                for key, table in stats.items():
+                    self.statistics += table
+                    if key not in self.lineups:
+                        self.lineups[key] = StatisticsTable()
+                    self.lineups[key] += table
+            elif stats is not None:
+                self.statistics += stats
+            if segment:
+                records.append(segment)
+            for k, v in (timings or {}).items():
+                self.profile[k] += v
+            if elapsed is not None:
+                size = min(self.BATCH_SIZE, int(self.BATCH_TIME * count / max(elapsed, 1e-6)) + 1)
+
+            for _ in range(count):
+                i += 1
+                if not self.quiet:
+                    if i % 500 == 0:  output('(%02i%%)\n' % (100*i/self.rounds))
+                    elif i % 125 == 0: output('O')
+                    elif i %  25 == 0: output('o')
+                    elif i %  5 == 0: output('.')
+
+        if self.pool is None:
+            pool.close()
+            pool.join()
+        if records is not None:
+            records.close()
+
+    def replay(self, index):
+        """Play again the game at this index in the competition, in this process
+        and with full validation, e.g. for debugging or profiling.  The bots'
+        decisions are the same as in the competition unless they learn across
+        games, or depend on the order of sets of strings, since the hashes of
+        strings vary between processes."""
+        players, roles, _, seed = next(itertools.islice(self.listGames(), index, None))
+        if not self.quiet:
+            print("Replaying game #%i: %s, spies %s." % (index, ', '.join([p.__name__ for p in players]),
+                    ', '.join([p.__name__ for p, r in zip(players, roles) if r])), file=sys.stderr)
+        try:
+            play((players, roles, True, seed), self.statistics, self.profile, self.budget)
+        except BudgetExceeded as e:
+            print("Game aborted: %s" % e, file=sys.stderr)
 
     def echo(self, *args):
         print(' '.join([str(a) for a in args]))
@@ -218,6 +890,25 @@ class CompetitionRunner(object):
             self.echo(" ", '{0:<16s}'.format(s[0]), s[1].total().detail())
         self.echo("")
 
+        timeouts = [s for s in self.statistics.items() if s[1].timeouts.total > 0]
+        if timeouts:
+            self.echo("TIMEOUTS")
+            for s in sorted(timeouts, key = lambda x: x[1].timeouts.total, reverse = True):
+                self.echo(" ", '{0:<16s}'.format(s[0]), "%i games" % s[1].timeouts.total, s[1].timeouts)
+            self.echo("")
+
+        if self.skipped:
+            self.echo("SKIPPED")
+            self.echo("  %i of %i games, after workers stopped responding." % (self.skipped, self.rounds))
+            self.echo("")
+
+        if self.profile:
+            self.echo("LATENCY\t\t\t\t   calls      total      p50      p99      max (ms)")
+            for (name, function), l in sorted(self.profile.items(), key = lambda x: x[1].total, reverse = True):
+                if l.count:
+                    self.echo(" ", '{0:<16s} {1:<18s}'.format(name, function), l.detail())
+            self.echo("")
+
 
 def getCompetitors(argv):
     competitors = []
@@ -247,15 +938,87 @@ def getCompetitors(argv):
     return competitors
 
 if __name__ == '__main__':
-    if len(sys.argv) <= 2:
-        print('USAGE: competition.py 10000 (filename|module.BotName) [...]')
-        sys.exit(-1)
+    import argparse
+
+    parser = argparse.ArgumentParser(usage='competition.py 10000 (filename|module.BotName) [...]')
+    parser.add_argument('rounds', type=int,
+                help = "Number of games to play in the competition.")
+    parser.add_argument('bots', nargs='+',
+                help = "Bot files, modules or module.BotName to compete.")
+    parser.add_argument('--trusted', action='store_true', default=False,
+                help = "Validate bots in warm-up games only, then skip checks for speed.")
+    parser.add_argument('--players', type=int, default=5, choices=range(5, 11),
+                help = "Number of players in each game, with the rules for that number.")
+    def seed(text):
+        value = int(text)
+        if not 0 <= value < CompetitionRunner.SEEDS:
+            raise argparse.ArgumentTypeError("must be between 0 and %i" % (CompetitionRunner.SEEDS - 1))
+        return value
 
-    competitors = getCompetitors(sys.argv[2:])
-    runner = CompetitionRunner(competitors, int(sys.argv[1]))
+    parser.add_argument('--seed', type=seed, default=None,
+                help = "Master seed for the schedule and all the games, random by default.")
+    parser.add_argument('--replay', type=int, default=None, metavar='GAME_ID',
+                help = "Only play again the game with this index, given the same seed.")
+    parser.add_argument('--profile', action='store_true', default=False,
+                help = "Time all calls to the bots, and show the slowest.")
+    parser.add_argument('--call-budget', type=float, default=None, metavar='SECONDS',
+                help = "Abort games where a single call to a bot takes longer than this.")
+    parser.add_argument('--game-budget', type=float, default=None, metavar='SECONDS',
+                help = "Abort games where a bot takes longer than this in total.")
+    parser.add_argument('--cpu', action='store_true', default=False,
+                help = "Measure the budgets in CPU time rather than wall-clock time.")
+    parser.add_argument('--log-level', default='DEBUG',
+                choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL', 'SILENT'],
+                help = "Only write the logs of the bots from this level, or none if SILENT.")
+    parser.add_argument('--adaptive', action='store_true', default=False,
+                help = "Stop once the ranking is settled, focusing on close bots until then.")
+    parser.add_argument('--record', default=None, metavar='FILE',
+                help = "Append binary records of all the games to this file, see record.py.")
+    parser.add_argument('--shared', action='store_true', default=False,
+                help = "Share what the learning bots learn between all the worker processes.")
+    parser.add_argument('--listen', default=None, metavar='ADDRESS',
+                help = "Play the games in workers that connect to host:port, port on localhost, or a Unix socket, see distributed.py.")
+    parser.add_argument('--authkey', default=None,
+                help = "Key shared with the workers to authenticate the connections, random by default.")
+    args = parser.parse_args()
+    logger.configure(args.log_level)
+
+    budget = None
+    if args.call_budget is not None or args.game_budget is not None:
+        budget = Budget(call = args.call_budget, game = args.game_budget, cpu = args.cpu)
+
+    competitors = getCompetitors(args.bots)
+    options = dict(validate = not args.trusted, seed = args.seed, profile = args.profile,
+                   budget = budget, record = args.record, adaptive = args.adaptive, players = args.players)
+    pool = None
+    if args.listen is not None:
+        # Imported as a module, so the games sent to the workers refer to
+        # `competition` rather than `__main__`.
+        import competition, distributed
+        authkey = args.authkey.encode('ascii') if args.authkey is not None else distributed.generateKey()
+        if args.authkey is None:
+            print("Start the workers with --authkey %s" % authkey.decode('ascii'), file=sys.stderr)
+        address = distributed.parseAddress(args.listen)
+        if args.shared:
+            # Remote workers reach the statistics on the same interface.
+            options['shared'] = shared.Server((address[0], 0) if isinstance(address, tuple) else None, authkey)
+        pool = distributed.RemotePool(address, args.bots, authkey)
+        runner = competition.CompetitionRunner(competitors, args.rounds, pool = pool, **options)
+    else:
+        if args.shared:
+            options['shared'] = shared.Server()
+        runner = CompetitionRunner(competitors, args.rounds, **options)
     try:
-        runner.main()
+        if args.replay is not None:
+            runner.replay(args.replay)
+        else:
+            runner.main()
     except (KeyboardInterrupt, SystemExit):
         pass
     finally:
         runner.show()
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if args.shared:
+            options['shared'].shutdown()
@@ -6,27 +6,86 @@ class Observable(type):
     in derived classes without having to explicitly call the base class.  The
     observers of the base classes are always called before those of the
     specialized classes.
+
+    The chain of observers for each callback is resolved once when a class is
+    created, then stored as a flat tuple in a dispatch function on that class.
+    Callbacks for which no observers are defined call the base function of the
+    `Bot` class directly.
+
+    Each observer is called exactly once per callback, even if it also calls
+    the callback of its base class with super(), as is natural in Python: the
+    observers of the base classes have already been called at that point, so
+    the dispatch function of a base class does nothing for instances of its
+    derived classes.
     """
     def __new__(cls, name, parents, dct):
         __hooks__ = collections.defaultdict(list)
         if name != 'Bot':
-            for (k, v) in dct.items():
+            for (k, v) in list(dct.items()):
                 if not k.startswith('on'):
                     continue
                 __hooks__[k].append(v)
                 del dct[k]
             dct['__hooks__'] = __hooks__
         else:
-            for (k, v) in dct.items():
-                if not k.startswith('on'):
-                    continue
-                def bind(name=k, function=v):
-                    def wrap(self, *args, **kwargs):
-                        for c in reversed(self.__class__.__mro__):                            
-                            if hasattr(c, '__hooks__'):
-                                for m in c.__hooks__.get(name, []):
-                                    m(self, *args, **kwargs)
-                        return function(self, *args, **kwargs)
-                    return wrap
-                dct[k] = bind()
+            observers = {}
+            for p in parents:
+                observers.update(getattr(p, '__observers__', {}))
+            observers.update([(k, v) for (k, v) in dct.items() if k.startswith('on')])
+            dct['__observers__'] = observers
         return super(Observable, cls).__new__(cls, name, parents, dct)
+
+    def __init__(self, name, parents, dct):
+        super(Observable, self).__init__(name, parents, dct)
+
+        observers = getattr(self, '__observers__', {})
+        for k, function in observers.items():
+            # Mixins earlier in the resolution order may define their own version
+            # of the callback, in which case the observers are not called.
+            owner = [c for c in self.__mro__ if k in c.__dict__][0]
+            if not isinstance(owner, Observable):
+                continue
+
+            hooks = []
+            for c in reversed(self.__mro__):
+                if hasattr(c, '__hooks__'):
+                    hooks.extend(c.__hooks__.get(k, []))
+            setattr(self, k, Observable.compile(tuple(hooks), function, self))
+
+    @staticmethod
+    def compile(hooks, function, cls):
+        """Build a function that calls all the hooks in order, followed by the
+        base function, with as little overhead as possible.  Calls made through
+        super() from the hooks of derived classes are skipped."""
+        if not hooks:
+            return function
+
+        if len(hooks) == 1:
+            hook = hooks[0]
+            def dispatch(self, *args, **kwargs):
+                if type(self) is not cls:
+                    return None
+                hook(self, *args, **kwargs)
+                return function(self, *args, **kwargs)
+        else:
+            def dispatch(self, *args, **kwargs):
+                if type(self) is not cls:
+                    return None
+                for m in hooks:
+                    m(self, *args, **kwargs)
+                return function(self, *args, **kwargs)
+        dispatch.__name__ = function.__name__
+        dispatch.__doc__ = function.__doc__
+        return dispatch
+
+
+def observable(cls):
+    """Class decorator that applies the `Observable` meta-class, which works on
+    Python 2 and 3 alike, unlike the `__metaclass__` attribute which only
+    Python 2 honours.  Derived classes then inherit the meta-class."""
+    if isinstance(cls, Observable):
+        return cls
+    dct = dict(cls.__dict__)
+    dct.pop('__dict__', None)
+    dct.pop('__weakref__', None)
+    return Observable(cls.__name__, cls.__bases__, dct)
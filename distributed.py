@@ -0,0 +1,318 @@
+"""Competitions played by workers on multiple machines, which connect to the
+runner over TCP or a Unix socket.
+
+The runner listens on an address and acts as the coordinator: it queues the
+chunks of games as usual, and each connected worker pulls one chunk at a time,
+plays it with `play_batch` and sends back the aggregated statistics.  While
+playing, the workers send a heartbeat every few seconds.  If a worker
+disconnects, or nothing is heard from it for `TIMEOUT` seconds because its
+machine went away, the chunk it was playing is put back at the front of the
+queue for the next worker, up to `RETRIES` times in case it's the chunk that
+brings the workers down.  Workers may connect and leave at any time during
+the competition.
+
+Launch the workers on each machine with, e.g. one process per core:
+
+    > python distributed.py coordinator:4200 --authkey KEY --processes 16
+
+The messages are pickled, so anyone who can connect could run code on the
+other side.  The connections are therefore authenticated with a secret key
+that must be given to the runner and the workers, and there's no default.
+
+The bots are imported by each worker from the same files or modules as the
+runner, so they must be available at the same paths on all machines.
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+import binascii
+import threading
+import collections
+import multiprocessing
+from multiprocessing.connection import Listener, Client
+
+import logger
+import shared
+from competition import WorkerPool, getCompetitors, setup, call
+
+
+# Seconds without a message from a worker playing games after which it's
+# considered lost.  The workers send a heartbeat several times in between.
+TIMEOUT = 60.0
+
+# Number of times a call is sent to another worker after losing the worker
+# that was playing it, before the call fails.
+RETRIES = 3
+
+# Exit code of the worker processes that must be started again.
+RESTART = 3
+
+
+def generateKey():
+    """Random key to authenticate the connections, as printable ASCII."""
+    return binascii.hexlify(os.urandom(16))
+
+
+def parseAddress(address):
+    """Address of a TCP socket given as `host:port`, or only `port` on the
+    local machine, otherwise the path of a Unix socket."""
+    host, _, port = address.rpartition(':')
+    if port.isdigit():
+        return (host or 'localhost', int(port))
+    return address
+
+
+class RemoteResult(object):
+    """Result of a call played by a worker, as returned by `Pool.apply_async`."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+        # Number of workers lost while playing this call.
+        self.attempts = 0
+
+    def set(self, status, value):
+        if status == 'ok':
+            self.value = value
+        else:
+            self.error = value
+        self.event.set()
+
+    def ready(self):
+        return self.event.is_set()
+
+    def get(self, timeout = None):
+        # Wait in steps so that KeyboardInterrupt isn't blocked.
+        deadline = None if timeout is None else time.time() + timeout
+        while not self.event.is_set():
+            step = 1.0 if deadline is None else min(1.0, deadline - time.time())
+            if step <= 0.0:
+                raise multiprocessing.TimeoutError()
+            self.event.wait(step)
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class RemotePool(WorkerPool):
+    """Pool of remote workers with the same interface as `WorkerPool`, which
+    can also be kept for successive competitions.  Each connection is served
+    by its own thread, which sends the queued calls to the worker one at a time.
+
+    After an error the workers are replaced, see `terminate()`, and a worker
+    still playing games from before is restarted once it's done."""
+
+    def __init__(self, address, specs, authkey, keep = False):
+        self.listener = Listener(address, backlog = 64, authkey = authkey)
+        self.address = self.listener.address
+        # Bots for the workers to import before playing, see `getCompetitors`.
+        self.specs = specs
+        self.tasks = collections.deque()
+        self.condition = threading.Condition()
+        self.workers = set()
+        self.generation = 0
+        self.closed = False
+        self.keep = keep
+        self.settings = None
+        self.version = (0, False, None)
+        self.timeout = TIMEOUT
+
+        thread = threading.Thread(target = self.accept, name = 'listener')
+        thread.daemon = True
+        thread.start()
+
+    @property
+    def processes(self):
+        """Number of workers currently connected."""
+        return len(self.workers)
+
+    def accept(self):
+        while not self.closed:
+            try:
+                connection = self.listener.accept()
+            except multiprocessing.AuthenticationError:
+                continue
+            except (EOFError, IOError, OSError):
+                break
+            thread = threading.Thread(target = self.serve, args = (connection,), name = 'worker')
+            thread.daemon = True
+            thread.start()
+
+    def serve(self, connection):
+        generation = self.generation
+        try:
+            connection.send(('setup', self.specs, logger.level, self.timeout / 4.0))
+            with self.condition:
+                self.workers.add(connection)
+            while True:
+                with self.condition:
+                    while not self.tasks and not self.closed and generation == self.generation:
+                        self.condition.wait(1.0)
+                    if generation != self.generation:
+                        connection.send(('restart',))
+                        break
+                    if not self.tasks:
+                        connection.send(('stop',))
+                        break
+                    task = self.tasks.popleft()
+
+                function, args, result = task
+                try:
+                    connection.send(('call', function, args))
+                    status, value = self.receive(connection)
+                except (EOFError, IOError, OSError) as e:
+                    # The worker is gone, so another one plays its games.
+                    with self.condition:
+                        result.attempts += 1
+                        if generation == self.generation and result.attempts > RETRIES:
+                            result.set('error', EOFError("Lost %i workers playing the same call: %s" % (result.attempts, e)))
+                        elif generation == self.generation:
+                            self.tasks.appendleft(task)
+                            self.condition.notify()
+                    raise
+                except Exception as e:
+                    status, value = 'error', e
+                if generation == self.generation:
+                    result.set(status, value)
+        except (EOFError, IOError, OSError):
+            pass
+        finally:
+            with self.condition:
+                self.workers.discard(connection)
+            connection.close()
+
+    def receive(self, connection):
+        """Wait for the result of a call, skipping the heartbeats of the
+        worker.  Raises EOFError if the worker is silent for too long."""
+        while True:
+            if not connection.poll(self.timeout):
+                raise EOFError("No heartbeat from the worker for %.0f seconds." % self.timeout)
+            message = connection.recv()
+            if message[0] != 'alive':
+                return message
+
+    def apply_async(self, function, args = ()):
+        result = RemoteResult()
+        with self.condition:
+            self.tasks.append((call, (self.version, function, args), result))
+            self.condition.notify()
+        return result
+
+    def terminate(self):
+        """Drop the queued calls, and ignore the results of those in progress.
+        The workers then reconnect as new processes before playing again, since
+        the bots may be corrupted."""
+        with self.condition:
+            self.generation += 1
+            self.tasks.clear()
+            self.condition.notify_all()
+
+    def close(self):
+        """Stop the workers once all the queued calls are done."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def join(self):
+        self.listener.close()
+
+
+def work(address, authkey, wait = 60.0):
+    """Connect to the runner and play the games it sends until it's done.
+    Returns True if the worker should be restarted in a new process."""
+    deadline = time.time() + wait
+    # The shared statistics are served by the same machine as the runner.
+    shared.coordinator = address[0] if isinstance(address, tuple) else None
+    while True:
+        try:
+            connection = Client(address, authkey = authkey)
+            break
+        except (IOError, OSError):
+            if time.time() > deadline:
+                return False
+            time.sleep(1.0)
+
+    # Sent from the heartbeat thread too, while the games are played.
+    lock = threading.Lock()
+    def send(message):
+        with lock:
+            connection.send(message)
+
+    def beat(done, interval):
+        try:
+            while not done.wait(interval):
+                send(('alive',))
+        except (EOFError, IOError, OSError):
+            pass
+
+    try:
+        interval = TIMEOUT / 4.0
+        while True:
+            message = connection.recv()
+            if message[0] == 'setup':
+                _, specs, level, interval = message
+                setup(level, getCompetitors(specs))
+            elif message[0] == 'call':
+                _, function, args = message
+                done = threading.Event()
+                heartbeat = threading.Thread(target = beat, args = (done, interval), name = 'heartbeat')
+                heartbeat.daemon = True
+                heartbeat.start()
+                try:
+                    response = ('ok', function(*args))
+                except Exception as e:
+                    response = ('error', e)
+                finally:
+                    done.set()
+                    heartbeat.join()
+                send(response)
+            else:
+                return message[0] == 'restart'
+    except (EOFError, IOError, OSError):
+        return False
+    finally:
+        connection.close()
+
+
+def worker(address, authkey):
+    # Uncaught exceptions exit with 1, and those workers aren't restarted.
+    sys.exit(RESTART if work(address, authkey) else 0)
+
+
+def launch(address, processes, authkey):
+    """Run worker processes until the runner is done, starting a new process
+    in place of each worker that needs to be restarted."""
+    def start():
+        p = multiprocessing.Process(target = worker, args = (address, authkey))
+        p.start()
+        return p
+
+    workers = [start() for _ in range(processes)]
+    try:
+        while workers:
+            time.sleep(0.1)
+            for i, p in enumerate(workers):
+                if not p.is_alive():
+                    workers[i] = start() if p.exitcode == RESTART else None
+            workers = [p for p in workers if p is not None]
+    except KeyboardInterrupt:
+        for p in workers:
+            p.terminate()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(usage='distributed.py (host:port|path) --authkey KEY [--processes N]')
+    parser.add_argument('address',
+                help = "Address where the runner listens, see competition.py --listen.")
+    parser.add_argument('--processes', type=int, default=multiprocessing.cpu_count(),
+                help = "Number of worker processes on this machine.")
+    parser.add_argument('--authkey', required=True,
+                help = "Key shared with the runner to authenticate the connection.")
+    args = parser.parse_args()
+
+    launch(parseAddress(args.address), args.processes, args.authkey.encode('ascii'))
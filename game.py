@@ -1,6 +1,9 @@
 import itertools
+import timeit
+import signal
+import time
 
-from player import Player
+from player import Player, Handle, Team, Bot, resettable
 
 
 class State(object):
@@ -10,8 +13,14 @@ class State(object):
 
     This data-structure is available in all the bot API functions, and gets
     updated automatically (in between API calls) once new information is
-    available about the game."""
+    available about the game.
 
+    The fields are stored in fixed slots rather than a dictionary, and the team
+    and votes are also tracked as bitmasks over the seats so that states can be
+    cloned, compared and hashed cheaply, e.g. by bots that search ahead."""
+
+    __slots__ = ('phase', 'turn', 'tries', 'wins', 'losses', 'leader', 'players',
+                 'sabotages', '_team', '_votes', 'teammask', 'votemask')
 
     PHASE_PREPARING = 0
     PHASE_SELECTION = 1
@@ -27,40 +36,206 @@ class State(object):
         self.wins = 0                   # int (0..3): Number of resistance wins.
         self.losses = 0                 # int (0..3): Number of spy victories.
         self.leader = None              # Player: Current mission leader.
-        self.team = None                # set(Player): Set of players picked.
+        self.team = None                # Team(Player): Sequence of players picked.
         self.players = None             # list[Player]: All players in a list.
         self.votes = None               # list[bool]: Votes for the mission.
         self.sabotages = None           # int (0..3): Number of sabotages.
 
+    @property
+    def team(self):
+        return self._team
+
+    @team.setter
+    def team(self, team):
+        self._team = team
+        # int: Bit i is set if the player at index i is on the team.
+        if team is None:
+            self.teammask = None
+        elif isinstance(team, Team):
+            self.teammask = team.mask
+        else:
+            mask = 0
+            for p in team:
+                mask |= 1 << p.index
+            self.teammask = mask
+
+    @property
+    def votes(self):
+        return self._votes
+
+    @votes.setter
+    def votes(self, votes):
+        self._votes = votes
+        # int: Bit i is set if the player at index i voted for the mission.
+        if votes is None:
+            self.votemask = None
+        else:
+            mask = 0
+            for i, v in enumerate(votes):
+                if v:
+                    mask |= 1 << i
+            self.votemask = mask
+
     def clone(self):
-        s = State()
-        s.__dict__ = self.__dict__.copy()
+        s = State.__new__(State)
+        s.phase, s.turn, s.tries = self.phase, self.turn, self.tries
+        s.wins, s.losses, s.sabotages = self.wins, self.losses, self.sabotages
+        s.leader, s.players = self.leader, self.players
+        s._team, s.teammask = self._team, self.teammask
+        s._votes, s.votemask = self._votes, self.votemask
         return s
 
+    __copy__ = clone
+
+    def key(self):
+        """Tuple of plain integers that uniquely identifies this state within
+        a game, which is used for comparisons and hashing."""
+        return (self.phase, self.turn, self.tries, self.wins, self.losses,
+                self.leader.index if self.leader is not None else -1,
+                self.teammask, self.votemask, self.sabotages)
+
     def __eq__(self, other):
-        return \
-                self.phase == other.phase           \
-            and self.turn == other.turn             \
-            and self.tries == other.tries           \
-            and self.wins == other.wins             \
-            and self.losses == other.losses         \
-            and self.leader == other.leader         \
-            and self.team == other.team             \
-            and self.players == other.players       \
-            and self.votes == other.votes           \
-            and self.sabotages == other.sabotages
+        return self.key() == other.key()                                    \
+            and self.leader == other.leader                                 \
+            and (self.players is other.players or self.players == other.players)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __getstate__(self):
+        return dict((k, getattr(self, k)) for k in self.__slots__)
+
+    def __setstate__(self, data):
+        for k, v in data.items():
+            setattr(self, k, v)
+
+    def fork(self):
+        """Forward model of the game from this state, see `Model`."""
+        return Model(self)
 
     def __repr__(self):
         output = "<State\n"
-        for key in sorted(self.__dict__):
-            value = self.__dict__[key]
+        for key in sorted(['phase', 'turn', 'tries', 'wins', 'losses', 'leader',
+                           'team', 'players', 'votes', 'sabotages']):
+            value = getattr(self, key)
             output += "\t- %s: %r\n" % (key, value)
         return output + ">"
 
 
+class BudgetExceeded(Exception):
+    """Raised from the call of a bot that runs out of time in a game with a
+    `Budget`, which aborts the game.  The name and index of the bot are stored
+    so the timeout can be held against it."""
+
+    def __init__(self, name, index, function, elapsed):
+        super(BudgetExceeded, self).__init__(name, index, function, elapsed)
+        self.name = name
+        self.index = index
+        self.function = function
+        self.elapsed = elapsed
+
+    def __str__(self):
+        return "%s.%s() exceeded its time budget after %0.3fs." % (self.name, self.function, self.elapsed)
+
+
+class Budget(object):
+    """Limits on the time that each bot can take in a game, in seconds, for a
+    single call and in total over the game.  Time is measured on the wall clock
+    by default, or as CPU time of the process with `cpu=True`.
+
+    Where timer signals are available a bot that runs past its limit is
+    interrupted, otherwise the timeout is detected when the call returns."""
+
+    def __init__(self, call=None, game=None, cpu=False):
+        if call is None and game is None:
+            raise ValueError("A budget needs a limit for each call, for the game, or both.")
+        self.call = call
+        self.game = game
+        self.cpu = cpu
+
+    def clock(self):
+        if self.cpu:
+            return time.process_time() if hasattr(time, 'process_time') else time.clock()
+        return timeit.default_timer()
+
+    @property
+    def timer(self):
+        """The interval timer and the signal it sends for this kind of clock."""
+        if not hasattr(signal, 'setitimer'):
+            return None, None
+        if self.cpu:
+            return signal.ITIMER_PROF, signal.SIGPROF
+        return signal.ITIMER_REAL, signal.SIGALRM
+
+    def limit(self, spent):
+        """Time allowed for the next call of a bot that has spent this much
+        time in the game already."""
+        if self.game is None:
+            return self.call
+        left = self.game - spent
+        return left if self.call is None else min(self.call, left)
+
+
+class Rules(object):
+    """Rules of the game that depend on the number of players: the size of the
+    team for each mission, the number of spies, the number of sabotages for a
+    mission to fail, and the number of votes to approve a team.  The tables
+    are built once for each number of players, see `Rules.get()`, along with
+    the legal actions used by `Model`."""
+
+    TEAMS = {5: [2, 3, 2, 3, 3],
+             6: [2, 3, 4, 3, 4],
+             7: [2, 3, 3, 4, 4],
+             8: [3, 4, 4, 5, 5],
+             9: [3, 4, 4, 5, 5],
+             10: [3, 4, 4, 5, 5]}
+    SPIES = {5: 2, 6: 2, 7: 3, 8: 3, 9: 3, 10: 4}
+
+    # Rules by number of players, built on demand.
+    cache = {}
+
+    def __init__(self, players):
+        if players not in self.TEAMS:
+            raise ValueError("Games of %i players are not supported, only %i to %i." % (players, min(self.TEAMS), max(self.TEAMS)))
+        self.players = players
+        self.participants = self.TEAMS[players]
+        self.spies = self.SPIES[players]
+        # With seven players or more the fourth mission needs two sabotages.
+        self.fails = [1, 1, 1, 2 if players >= 7 else 1, 1]
+        self.majority = players // 2 + 1
+        # All the distinct assignments of roles to the seats, with True for
+        # the spies, in a fixed order.
+        self.roles = sorted([tuple([s in spies for s in range(players)])
+                             for spies in itertools.combinations(range(players), self.spies)])
+
+        # int: Bitmasks of the seats of all the teams of each size, and of all
+        # the votes, along with the votes as booleans and whether they approve.
+        seats = range(players)
+        self.teams = dict((count, tuple([sum([1 << s for s in t]) for t in itertools.combinations(seats, count)]))
+                          for count in set(self.participants))
+        self.votes = tuple(range(1 << players))
+        self.ballots = tuple([tuple([bool(v >> s & 1) for s in seats]) for v in self.votes])
+        self.approved = tuple([sum(b) >= self.majority for b in self.ballots])
+        # Possible numbers of sabotages for teams of each size.
+        self.sabotages = dict((count, tuple(range(min(count, self.spies) + 1))) for count in self.teams)
+
+    @classmethod
+    def get(cls, players):
+        rules = cls.cache.get(players)
+        if rules is None:
+            rules = cls.cache[players] = cls(players)
+        return rules
+
+    def __repr__(self):
+        return "<Rules players=%i spies=%i>" % (self.players, self.spies)
+
+
 class BaseGame(object):
-    """Implementation of the core gameplay of THE RESISTANCE.  This class
-    currently only supports games of 5 players."""
+    """Implementation of the core gameplay of THE RESISTANCE, for games of 5 to
+    10 players with the rules for that number of players, see `Rules`."""
 
     MAX_TURNS = 5
     MAX_TRIES = 5
@@ -93,11 +268,21 @@ class BaseGame(object):
         pass
 
 
-    def __init__(self, state=None):
+    def __init__(self, state=None, validate=True):
         self.state = state or State()
 
-        # Configuration for the game itself.
-        self.participants = [2, 3, 2, 3, 3]
+        # Check the data returned by the bots, which is only necessary for bots
+        # that are not trusted, e.g. during development.
+        self.validate = validate
+
+    @property
+    def rules(self):
+        """Configuration for the game itself, given the number of players."""
+        return Rules.get(len(self.state.players))
+
+    @property
+    def participants(self):
+        return self.rules.participants
 
     def run(self):
         """Main entry point for the resistance game.  Once initialized call this to 
@@ -108,7 +293,7 @@ class BaseGame(object):
             self.step()
         
         # Pass back the results to the bots so they can do some learning!
-        spies = set([Player(p.name, p.index) for p in self.bots if p.spy])
+        spies = set([self.state.players[p.index] for p in self.bots if p.spy])
         for p in self.bots:
             p.onGameComplete(self.state.wins >= self.NUM_WINS, spies)
         self.onGameComplete(self.state.wins >= self.NUM_WINS, spies)
@@ -139,6 +324,10 @@ class BaseGame(object):
         li = ((self.state.leader.index+1) % len(self.state.players)) if self.state.leader else 0
         return self.state.players[li]
 
+    def fork(self):
+        """Forward model of the game from its current state, see `Model`."""
+        return Model(self.state, self.rules)
+
     def get_selection(self, count):
         raise NotImplementedError
 
@@ -153,8 +342,9 @@ class BaseGame(object):
         count = self.participants[self.state.turn-1]
         selected = self.get_selection(count)
 
-        # Copy the list to make sure no internal data is leaked to the other bots!
-        self.state.team = [Player(s.name, s.index) for s in selected]
+        # Map the selection to the shared player handles, which also makes sure
+        # no internal data is leaked to the other bots!
+        self.state.team = Team(self.state.players, selected)
         self.callback('onTeamSelected', self.state.leader, self.state.team)
 
         self.state.phase = State.PHASE_VOTING
@@ -166,14 +356,18 @@ class BaseGame(object):
         """Phase 2) Notify other bots of the selection and ask for a vote."""
 
         votes = self.get_votes()
-        
-        self.state.votes = votes[:]
-        self.callback('onVoteComplete', votes[:])
+
+        if self.validate:
+            self.state.votes = votes[:]
+            self.callback('onVoteComplete', votes[:])
+        else:
+            self.state.votes = votes
+            self.callback('onVoteComplete', votes)
 
         score = sum([int(v) for v in self.state.votes])
 
         # Continue if there was a clear majority...
-        if score > 2:
+        if score >= self.rules.majority:
             self.state.phase = State.PHASE_MISSION
         else:
             self.callback('onMissionFailed', self.state.leader, self.state.team)
@@ -188,7 +382,7 @@ class BaseGame(object):
         the mission or sabotage!"""
 
         sabotaged = self.get_sabotages()
-        if sabotaged == 0:
+        if sabotaged < self.rules.fails[self.state.turn-1]:
             self.state.wins += 1
         else:
             self.state.losses += 1
@@ -206,13 +400,19 @@ class BaseGame(object):
     def do_announcements(self):
         """Phase 4) Allow bots to publicly announce what they want about the game.
         """
+        players = self.state.players
         for source, ann in self.get_announcements():
+            if not self.validate:
+                self.onAnnouncement(source, ann)
+                continue
+
             copy = {}
-            assert type(ann) is dict, "Please return a dictionary from %s.announce(), not %s." % (p.name, type(ann))
+            assert type(ann) is dict, "Please return a dictionary from %s.announce(), not %s." % (source.name, type(ann))
             for k, v in ann.items():
-                assert isinstance(k, Player), "Please use Player objects as dictionary key in %s.announce()." % (p.name)
-                assert isinstance(v, float), "Please use floats as dictionary values in %s.announce()." % (p.name)
-                copy[Player(k.name, k.index)] = v
+                assert isinstance(k, Player), "Please use Player objects as dictionary key in %s.announce()." % (source.name)
+                assert isinstance(v, float), "Please use floats as dictionary values in %s.announce()." % (source.name)
+                assert 0 <= k.index < len(players) and players[k.index] == k, "The specified Player does not exist in this game: %r." % (k)
+                copy[players[k.index]] = v
 
             self.onAnnouncement(source, copy)
 
@@ -241,18 +441,275 @@ class BaseGame(object):
             assert False, "Not expecting this game phase."
 
 
+class Model(object):
+    """Forward model of the game for bots that search ahead, which plays the
+    actions of all the players from a copy of a state without calling any bots:
+
+        model = self.game.fork()
+        for team in model.actions():
+            model.apply(team)
+            ...
+            model.undo()
+
+    The action for each phase is a plain integer: the bitmask of the seats on
+    the team when selecting, the bitmask of the seats that voted for the team
+    when voting, and the number of sabotages during the mission.  The legal
+    actions are precomputed once for each number of players, see `Rules`.
+    Models are meant to be forked when a bot makes a decision, i.e. from the
+    `select()`, `vote()`, `sabotage()` or `announce()` functions.
+
+    Each action is recorded so that `undo()` restores the previous state, and
+    `fork()` makes an independent copy of the model at its current state.  The
+    copies share the list of players and the teams, which are never modified,
+    so making many copies or playing many rollouts allocates little memory."""
+
+    __slots__ = ('state', 'history', 'rules', 'teams')
+
+    def __init__(self, state, rules = None, teams = None):
+        self.state = state.clone()
+        self.history = []
+        self.rules = rules or Rules.get(len(state.players))
+        # Team instances by mask, shared by all the copies of this model.
+        self.teams = {} if teams is None else teams
+
+    def fork(self):
+        return Model(self.state, self.rules, self.teams)
+
+    def actions(self):
+        """Tuple of the legal actions in the current phase."""
+        s, r = self.state, self.rules
+        if s.phase == State.PHASE_SELECTION:
+            return r.teams[r.participants[s.turn-1]]
+        if s.phase == State.PHASE_VOTING:
+            return r.votes
+        if s.phase == State.PHASE_MISSION:
+            return r.sabotages[len(s.team)]
+        return (None,)
+
+    def team(self, mask):
+        t = self.teams.get(mask)
+        if t is None:
+            players = self.state.players
+            t = self.teams[mask] = Team(players, [p for p in players if mask >> p.index & 1])
+        return t
+
+    def apply(self, action):
+        """Play the action of the current phase, then move on to the next
+        decision, skipping the announcements."""
+        s = self.state
+        self.history.append((s.phase, s.turn, s.tries, s.wins, s.losses, s.leader, s.sabotages,
+                             s._team, s.teammask, s._votes, s.votemask))
+        if s.phase == State.PHASE_SELECTION:
+            s._team, s.teammask = self.team(action), action
+            s._votes, s.votemask, s.sabotages = None, None, None
+            s.phase = State.PHASE_VOTING
+        elif s.phase == State.PHASE_VOTING:
+            s._votes, s.votemask = self.rules.ballots[action], action
+            if self.rules.approved[action]:
+                s.phase = State.PHASE_MISSION
+            else:
+                s.tries += 1
+                self.announce()
+        elif s.phase == State.PHASE_MISSION:
+            if action < self.rules.fails[s.turn-1]:
+                s.wins += 1
+            else:
+                s.losses += 1
+            s.sabotages = action
+            s.turn += 1
+            s.tries = 1
+            self.announce()
+        elif s.phase == State.PHASE_ANNOUNCING:
+            self.announce()
+        elif s.phase == State.PHASE_PREPARING:
+            s.phase = State.PHASE_SELECTION
+
+    def announce(self):
+        s = self.state
+        s.phase = State.PHASE_ANNOUNCING
+        if not self.done:
+            s.leader = s.players[(s.leader.index + 1) % len(s.players)]
+            s.phase = State.PHASE_SELECTION
+
+    def undo(self):
+        """Restore the state from before the last action applied."""
+        s = self.state
+        (s.phase, s.turn, s.tries, s.wins, s.losses, s.leader, s.sabotages,
+         s._team, s.teammask, s._votes, s.votemask) = self.history.pop()
+
+    @property
+    def done(self):
+        s = self.state
+        return s.tries > BaseGame.MAX_TRIES or s.turn > BaseGame.MAX_TURNS  \
+            or s.wins >= BaseGame.NUM_WINS or s.losses >= BaseGame.NUM_LOSSES
+
+    @property
+    def won(self):
+        return self.state.wins >= BaseGame.NUM_WINS
+
+    @property
+    def lost(self):
+        return self.state.losses >= BaseGame.NUM_LOSSES
+
+
+# Bot classes that are told the roles of all the players, see `oracle()`.
+ORACLES = set()
+
+
+def oracle(cls):
+    """Let the bots of exactly this class know who the spies are in every
+    game, whatever their role, as the `spies` passed to onGameRevealed().
+    This is only meant for bots of known skill that others are measured
+    against, like those in cheaters.py, and can be used as a decorator."""
+    ORACLES.add(cls)
+    return cls
+
+
 class Game(BaseGame):
 
-    def __init__(self, bots, roles, state=None):
-        super(Game, self).__init__(state=state)
+    # Functions of the bots that are timed when profiling or enforcing a budget.
+    PROFILED = ['select', 'vote', 'sabotage', 'announce'] \
+             + sorted([k for k in Bot.__dict__ if k.startswith('on')])
+
+    def __init__(self, bots, roles, state=None, validate=True, profile=None, budget=None):
+        super(Game, self).__init__(state=state, validate=validate)
 
         # Create Bot instances based on the constructor passed in.
         self.bots = [p(self.state, i, r) for p, r, i in zip(bots, roles, range(0, len(bots)))]
-        self.spies = set([Player(p.name, p.index) for p in self.bots if p.spy])
-        
-        # Maintain a copy of players that includes minimal data, for passing to other bots.
-        self.state.players = [Player(p.name, p.index) for p in self.bots]
+
+        # Optionally time all calls to the bots, which are stored in the given
+        # defaultdict of Latency objects indexed by (bot name, function name).
+        self.profile = profile
+        if profile is not None:
+            for b in self.bots:
+                self.instrument(b, profile)
+        # Optionally limit the time taken by the bots, see `Budget`.
+        self.budget = budget
+        self.spent = {}
+        if budget is not None:
+            self.running = None
+            self.interruptible = self.arm(budget)
+            for b in self.bots:
+                self.limit(b, budget)
+        # Maintain a table of players that includes minimal data, for passing to
+        # other bots.  These handles are shared for the whole game.
+        self.state.players = [Handle(p.name, p.index) for p in self.bots]
+        self.spies = set([self.state.players[p.index] for p in self.bots if p.spy])
+        self.state.leader = self.next_leader()
+
+    def reset(self, roles, seating=None):
+        """Prepare this game to be played again from the start with the same
+        bots, e.g. for the next game of a competition with the same lineup.
+        The roles are given for each seat, and the seating optionally as the
+        current index of the bot to place in each seat.  The bots that
+        implement `Bot.onReset()` are reused and told about their new seat and
+        role, while the others are created again as for a new game."""
+        handles = self.state.players
+        self.state.__init__()
+        self.running = None
+        # Another game may have installed its own handler since this one was
+        # created, so the timer signal is sent back to this game.
+        if self.budget is not None:
+            self.interruptible = self.arm(self.budget)
+
+        bots, kept = [], []
+        for i, r in enumerate(roles):
+            b = self.bots[seating[i] if seating is not None else i]
+            if resettable(type(b)):
+                b.index, b.spy, b.game = i, r, self.state
+                kept.append(b)
+            else:
+                b = type(b)(self.state, i, r)
+                if self.profile is not None:
+                    self.instrument(b, self.profile)
+                if self.budget is not None:
+                    self.limit(b, self.budget)
+            bots.append(b)
+        self.bots = bots
+
+        # The budget of the bots that are kept starts again from scratch.
+        self.spent = dict((id(b), self.spent[id(b)]) for b in bots if id(b) in self.spent)
+        for spent in self.spent.values():
+            spent[0] = 0.0
+
+        # Handles are only created for the seats where the bot changed.
+        self.state.players = [h if h.name == b.name else Handle(b.name, b.index) for h, b in zip(handles, bots)]
+        self.spies = set([self.state.players[p.index] for p in self.bots if p.spy])
         self.state.leader = self.next_leader()
+        for b in kept:
+            b.onReset()
+
+    def instrument(self, bot, profile):
+        """Wrap the functions of this bot instance to record their timings."""
+        def timed(function, latency):
+            def call(*args, **kwargs):
+                t = timeit.default_timer()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    latency.sample(timeit.default_timer() - t)
+            return call
+
+        for name in self.PROFILED:
+            latency = profile[(bot.name, name)]
+            setattr(bot, name, timed(getattr(bot, name), latency))
+
+    def arm(self, budget):
+        """Install the handler for the timer signal, which is only possible in
+        the main thread of a process."""
+        timer, signum = budget.timer
+        if timer is None:
+            return False
+        try:
+            signal.signal(signum, self.interrupt)
+        except ValueError:
+            return False
+        return True
+
+    def interrupt(self, signum, frame):
+        # The signal may arrive just after the call returned, in which case the
+        # timeout is detected by the caller instead.
+        if self.running is None:
+            return
+        bot, function, t = self.running
+        raise BudgetExceeded(bot.name, bot.index, function, self.budget.clock() - t)
+
+    def limit(self, bot, budget):
+        """Wrap the functions of this bot instance to enforce the budget, so the
+        call that runs out of time raises BudgetExceeded."""
+        timer, _ = budget.timer
+        spent = self.spent[id(bot)] = [0.0]
+
+        def limited(function, name):
+            def call(*args, **kwargs):
+                # Bots calling their own functions are only timed once.
+                if self.running is not None:
+                    return function(*args, **kwargs)
+
+                limit = budget.limit(spent[0])
+                if limit <= 0.0:
+                    raise BudgetExceeded(bot.name, bot.index, name, spent[0])
+
+                t = budget.clock()
+                self.running = (bot, name, t)
+                if self.interruptible:
+                    signal.setitimer(timer, limit)
+                try:
+                    result = function(*args, **kwargs)
+                finally:
+                    if self.interruptible:
+                        signal.setitimer(timer, 0)
+                    self.running = None
+                    elapsed = budget.clock() - t
+                    spent[0] += elapsed
+
+                if elapsed > limit:
+                    raise BudgetExceeded(bot.name, bot.index, name, elapsed)
+                return result
+            return call
+
+        for name in self.PROFILED:
+            setattr(bot, name, limited(getattr(bot, name), name))
 
     def onPlayerSelected(self, player, team):
         pass
@@ -266,32 +723,36 @@ class Game(BaseGame):
         getattr(self, name)(*args)
 
     def onGameRevealed(self, players, spies):
-        # Tell the bots who the spies are if they are allowed to know.        
+        # Tell the bots who the spies are if they are allowed to know.
         for p in self.bots:
-            p.onGameRevealed(self.state.players, spies if p.spy else set())
+            p.onGameRevealed(self.state.players, spies if p.spy or type(p) in ORACLES else set())
 
     def get_selection(self, count):
         leader = self.bots[self.state.leader.index]
         selected = leader.select(self.state.players, count)
+        if not self.validate:
+            self.onPlayerSelected(leader, Team(self.bots, selected))
+            return selected
 
         # Check the data returned by the bots is in the expected format!
-        assert type(selected) in [list, set, tuple], "Expecting a list|set|tuple as a return value of select(), not %s." % type(selected)
+        assert isinstance(selected, (list, set, tuple)), "Expecting a list|set|tuple as a return value of select(), not %s." % type(selected)
         assert len(set(selected)) == len(selected), "There were duplicate players returned in the list by %s.select()." % (leader.name)
         assert len(selected) == count, "The list returned by %s.select() is of the wrong size!  Expecting %i was %i." % (leader.name, count, len(selected))
         for s in selected:
             assert isinstance(s, Player), "Please return Player objects in the list from %s.select()." % (leader.name)
-            assert s in self.state.players, "The specified Player does not exist in this game: %r." % (s)
+            assert 0 <= s.index < len(self.bots) and self.state.players[s.index] == s, "The specified Player does not exist in this game: %r." % (s)
 
         # Make an internal callback, e.g. to track statistics about selection.
-        self.onPlayerSelected(leader, [b for b in self.bots if b in selected])
+        self.onPlayerSelected(leader, Team(self.bots, selected))
         return selected
 
     def get_votes(self):
         votes = []
+        team = Team(self.bots, self.state.team)
         for p in self.bots:
             v = p.vote(self.state.team)
-            assert type(v) is bool, "Please return a boolean from %s.vote() instead of %s." % (p.name, type(v))
-            self.onPlayerVoted(p, v, self.state.leader, [b for b in self.bots if b in self.state.team])
+            assert not self.validate or type(v) is bool, "Please return a boolean from %s.vote() instead of %s." % (p.name, type(v))
+            self.onPlayerVoted(p, v, self.state.leader, team)
             votes.append(v)
         return votes
 
@@ -313,13 +774,14 @@ class Game(BaseGame):
         for s in self.state.team:
             p = self.bots[s.index]
             result = p.sabotage() and p.spy
-            assert type(result) is bool, "Please return a boolean from %s.sabotage(), not %s." % (p.name, type(result))
+            assert not self.validate or type(result) is bool, "Please return a boolean from %s.sabotage(), not %s." % (p.name, type(result))
             sabotaged += int(result)
         return sabotaged
 
     def onAnnouncement(self, player, announcement):
-        for other in [o for o in self.bots if o != player]:
+        for other in [o for o in self.bots if o.index != player.index]:
             other.onAnnouncement(player, announcement)
 
     def get_announcements(self):
-        return [(p, ann) for p, ann in [(Player(p.name, p.index), p.announce()) for p in self.bots] if ann]
+        players = self.state.players
+        return [(p, ann) for p, ann in [(players[p.index], p.announce()) for p in self.bots] if ann]
@@ -0,0 +1,151 @@
+"""Sets of hypotheses about which players are the spies, for the bots that
+reason logically about the results of the missions.
+
+Each hypothesis, or configuration, is a bitmask over the seats with one bit set
+for each spy.  A set of hypotheses is in turn a bitmask over the table of all
+the configurations, so it can be copied and compared as a plain integer.  For
+every possible team, the configurations with each number of spies on that team
+are precomputed, so that keeping only the hypotheses consistent with a mission
+is a single AND of two bitmasks rather than a test of each configuration.  The
+tables are built once for each number of players, see `Table`.
+"""
+import random
+import itertools
+
+from game import Rules
+
+
+def count(mask):
+    """Number of bits set in the mask."""
+    return bin(mask).count('1')
+
+
+class Table(object):
+    """Configurations of the spies for a number of players, and the filters
+    precomputed for every possible team, built once, see `Table.get()`.
+
+        configurations  list[int]: Bitmask of the seats of the spies for each
+                        hypothesis, in a fixed order.
+        exactly         exactly[team][n]: Configurations with exactly n spies
+                        on the team, given as a bitmask of the seats.
+        at_least        at_least[team][n]: Those with n spies or more.
+        innocent        Configurations where each seat is not a spy.
+    """
+
+    # Tables by number of players, built on demand.
+    cache = {}
+
+    def __init__(self, players):
+        spies = Rules.get(players).spies
+        self.players = players
+        self.spies = spies
+        self.configurations = [sum([1 << s for s in seats]) for seats in itertools.combinations(range(players), spies)]
+        self.all = (1 << len(self.configurations)) - 1
+
+        teams = range(1 << players)
+        self.exactly = [[0] * (spies + 1) for _ in teams]
+        for i, c in enumerate(self.configurations):
+            bit = 1 << i
+            for team in teams:
+                self.exactly[team][count(c & team)] |= bit
+        self.at_least = []
+        for row in self.exactly:
+            cumulative = [0] * (spies + 1)
+            for n in range(spies, -1, -1):
+                cumulative[n] = row[n] | (cumulative[n+1] if n < spies else 0)
+            self.at_least.append(cumulative)
+        self.innocent = [self.exactly[1 << s][0] for s in range(players)]
+
+    @classmethod
+    def get(cls, players):
+        table = cls.cache.get(players)
+        if table is None:
+            table = cls.cache[players] = cls(players)
+        return table
+
+
+def mask(players):
+    """Bitmask of the seats of these players, e.g. a team or a list of them."""
+    m = getattr(players, 'mask', None)
+    if m is None:
+        m = 0
+        for p in players:
+            m |= 1 << p.index
+    return m
+
+
+def members(players, config):
+    """The players whose seats are in the configuration, in the same order."""
+    return [p for p in players if config >> p.index & 1]
+
+
+class Hypotheses(object):
+    """Immutable set of the configurations of spies that are still possible.
+    The filters return a new set, and iterating gives the configurations.
+
+        h = Hypotheses.excluding(self.index, len(self.game.players))
+        h = h.sabotaged(self.game.team, sabotaged)
+        for config in h:
+            spies = members(self.game.players, config)
+    """
+
+    __slots__ = ('bits', 'table')
+
+    def __init__(self, bits = None, players = 5, table = None):
+        self.table = table or Table.get(players)
+        self.bits = self.table.all if bits is None else bits
+
+    @classmethod
+    def excluding(cls, index, players = 5):
+        """The configurations where the player in this seat is not a spy, i.e.
+        from the point of view of a resistance player."""
+        table = Table.get(players)
+        return cls(table.innocent[index], table = table)
+
+    def sabotaged(self, team, sabotages):
+        """Keep the configurations with at least as many spies on the team as
+        the number of sabotages, given the team as players or a seat mask."""
+        team = team if isinstance(team, int) else mask(team)
+        t = self.table
+        return Hypotheses(self.bits & t.at_least[team][sabotages] if sabotages <= t.spies else 0, table = t)
+
+    def exactly(self, team, spies):
+        """Keep the configurations with exactly this many spies on the team."""
+        team = team if isinstance(team, int) else mask(team)
+        t = self.table
+        return Hypotheses(self.bits & t.exactly[team][spies] if spies <= t.spies else 0, table = t)
+
+    def clean(self, team):
+        """Keep the configurations with no spies on the team."""
+        return self.exactly(team, 0)
+
+    def choice(self):
+        return random.choice(list(self))
+
+    def __iter__(self):
+        b, i, configurations = self.bits, 0, self.table.configurations
+        while b:
+            if b & 1:
+                yield configurations[i]
+            b >>= 1
+            i += 1
+
+    def __len__(self):
+        return count(self.bits)
+
+    def __bool__(self):
+        return self.bits != 0
+
+    __nonzero__ = __bool__
+
+    def __eq__(self, other):
+        return isinstance(other, Hypotheses) and self.bits == other.bits and self.table is other.table
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __repr__(self):
+        return "<Hypotheses %s>" % ", ".join([format(c, '0%ib' % self.table.players) for c in self])
@@ -0,0 +1,198 @@
+"""Counters by key persisted in an append-only file, which several processes
+can update at the same time, e.g. the learned statistics of a bot.
+
+Each process accumulates its increments in memory and appends them in a
+single frame when flushed, so the cost of storing them depends on the number
+of keys that changed rather than the size of the whole database.  Every frame
+has a header with its size and checksum:
+
+    magic (4 bytes), size (uint32), crc32 (uint32),
+    pickled (writer, [(key, total, samples)])
+
+Frames are appended to a file opened in append mode while holding a lock,
+so the increments of concurrent writers are never interleaved, even if a
+large frame takes several writes.  A frame that was
+only partly written, e.g. if the process crashed, is skipped by the readers,
+which find the start of the next frame from its magic number.  Readers only
+parse the frames appended since they last read the file.
+
+The file is rewritten with the totals for each key by `compact()`, while
+holding the same lock.
+"""
+import os
+import zlib
+import struct
+import random
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class Journal(object):
+    """Append-only file of increments to counters, which stores the total of
+    the values and the number of samples for each key.  The increments made by
+    this journal are stored with `add()` and `flush()`, and the increments made
+    by other processes are returned by `read()`."""
+
+    MAGIC = b'JNL\x01'
+    HEADER = struct.Struct('<4sII')
+
+    def __init__(self, filename):
+        self.filename = filename
+        # Unique id of this writer, to skip its own frames when reading.
+        self.writer = '%i-%08x' % (os.getpid(), random.getrandbits(32))
+        self.pending = {}
+        # Position and identity of the file that was read so far.
+        self.offset = 0
+        self.inode = None
+        self.frames = 0
+
+    def add(self, key, total, samples = 1):
+        c = self.pending.get(key)
+        if c is None:
+            c = self.pending[key] = [0.0, 0]
+        c[0] += total
+        c[1] += samples
+
+    def flush(self):
+        """Append the pending increments to the file as one frame."""
+        if not self.pending:
+            return
+        with self.lock(True):
+            self.append()
+
+    def initialize(self, increments):
+        """Store the increments returned by the function as the first frame,
+        unless the file already exists, e.g. to import older data.  Only one of
+        several processes starting at the same time does so.  Returns True if
+        this journal created the file."""
+        with self.lock(True):
+            if os.path.exists(self.filename):
+                return False
+            for key, total, samples in increments():
+                self.add(key, total, samples)
+            self.append()
+            return True
+
+    def append(self):
+        # Written in a loop, since large frames may take several writes.
+        payload = pickle.dumps((self.writer, [(k, v[0], v[1]) for k, v in self.pending.items()]), 2)
+        data = self.frame(payload)
+        fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            while data:
+                written = os.write(fd, data)
+                if written <= 0:
+                    raise IOError("Could not write to %s." % self.filename)
+                data = data[written:]
+        finally:
+            os.close(fd)
+        self.pending = {}
+
+    def frame(self, payload):
+        return self.HEADER.pack(self.MAGIC, len(payload), zlib.crc32(payload) & 0xffffffff) + payload
+
+    def parse(self, data):
+        """Iterate over the complete frames in the data, as (writer, items)
+        and the position after the frame."""
+        position = 0
+        while position + self.HEADER.size <= len(data):
+            magic, size, checksum = self.HEADER.unpack_from(data, position)
+            start = position + self.HEADER.size
+            payload = data[start:start + size]
+            if magic != self.MAGIC or len(payload) < size or zlib.crc32(payload) & 0xffffffff != checksum:
+                # Either the last frame is still being written, or this frame
+                # was never finished and the next one starts after it.
+                position = data.find(self.MAGIC, position + 1)
+                if position < 0:
+                    break
+                continue
+            position = start + size
+            writer, items = pickle.loads(payload)
+            yield writer, items, position
+
+    def read(self):
+        """Return the increments appended by the other writers since the last
+        read, as a list of (key, total, samples).  The first value returned
+        is True if the file was replaced since, e.g. by a compaction, in which
+        case the increments are all those known to this journal, including
+        its own, so the counters should be computed again from scratch."""
+        try:
+            f = open(self.filename, 'rb')
+        except IOError:
+            return False, []
+        with f:
+            inode = os.fstat(f.fileno()).st_ino
+            replaced = inode != self.inode
+            if replaced:
+                self.inode, self.offset, self.frames = inode, 0, 0
+            f.seek(self.offset)
+            data = f.read()
+
+        increments, end = [], 0
+        for writer, items, end in self.parse(data):
+            if writer != self.writer or replaced:
+                increments.extend(items)
+            self.frames += 1
+        self.offset += end
+        if replaced:
+            increments.extend([(k, v[0], v[1]) for k, v in self.pending.items()])
+        return replaced, increments
+
+    def compact(self):
+        """Rewrite the file with a single frame of the totals for each key."""
+        with self.lock(True):
+            try:
+                with open(self.filename, 'rb') as f:
+                    data = f.read()
+            except IOError:
+                return
+
+            totals = {}
+            for _, items, _ in self.parse(data):
+                for key, total, samples in items:
+                    c = totals.get(key)
+                    if c is None:
+                        c = totals[key] = [0.0, 0]
+                    c[0] += total
+                    c[1] += samples
+
+            # Replaced at once, so readers see either the old or new file.
+            temporary = '%s.%s' % (self.filename, self.writer)
+            with open(temporary, 'wb') as f:
+                f.write(self.frame(pickle.dumps((None, [(k, v[0], v[1]) for k, v in totals.items()]), 2)))
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(temporary, self.filename)
+
+    def lock(self, exclusive):
+        return Lock(self.filename + '.lock', exclusive)
+
+
+class Lock(object):
+    """Lock on a file shared by all processes, either exclusive or shared,
+    which does nothing on platforms without `fcntl`."""
+
+    def __init__(self, filename, exclusive):
+        self.filename = filename
+        self.exclusive = exclusive
+        self.fd = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.fd = os.open(self.filename, os.O_WRONLY | os.O_CREAT, 0o644)
+            fcntl.flock(self.fd, fcntl.LOCK_EX if self.exclusive else fcntl.LOCK_SH)
+        return self
+
+    def __exit__(self, *args):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
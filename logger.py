@@ -0,0 +1,156 @@
+"""Asynchronous logging for the bots, stored in `logs/<name>.log`.
+
+The loggers of all the bots in a process share one handler that only puts the
+records in a queue, and a single background thread formats the records and
+writes them to the files in batches.  The arguments of each record are only
+formatted later by that thread, so they shouldn't be modified after logging.
+
+Records below the configured level are dropped by the loggers themselves
+before anything is formatted, and with the `SILENT` level logging costs no
+more than checking that level.
+"""
+import os
+import logging
+import threading
+import collections
+import multiprocessing.util
+
+
+
+# Level above all others that disables the logs of the bots completely.
+SILENT = logging.CRITICAL + 1
+
+# Current level of the loggers of the bots.
+level = logging.DEBUG
+
+
+class Writer(object):
+    """Background thread that writes the queued records of all the bots to
+    their log files, in batches every so often or once enough are queued."""
+
+    # Number of records that wakes up the thread early, and the maximum number
+    # waiting after which the bots write the records themselves.
+    BATCH = 1000
+    CAPACITY = 100000
+
+    # Maximum delay in seconds before the queued records are written.
+    INTERVAL = 0.5
+
+    def __init__(self, directory = 'logs'):
+        self.directory = directory
+        self.formatter = logging.Formatter()
+        self.records = collections.deque()
+        self.files = {}
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.stopped = False
+        self.thread = threading.Thread(target = self.run, name = 'logger')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def put(self, record):
+        # Appending to a deque is atomic, so no lock is needed here.
+        self.records.append(record)
+        n = len(self.records)
+        if n >= self.BATCH and not self.ready.is_set():
+            self.ready.set()
+        if n >= self.CAPACITY:
+            self.flush()
+
+    def run(self):
+        while not self.stopped:
+            self.ready.wait(self.INTERVAL)
+            self.ready.clear()
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            records = self.records
+            batch = []
+            try:
+                while True:
+                    batch.append(records.popleft())
+            except IndexError:
+                pass
+            self.write(batch)
+
+    def write(self, records):
+        lines = {}
+        for record in records:
+            try:
+                line = self.formatter.format(record) + '\n'
+            except Exception:
+                continue
+            if not isinstance(line, str):
+                line = line.encode('utf-8')
+            lines.setdefault(record.name, []).append(line)
+
+        for name, output in lines.items():
+            f = self.open(name)
+            if f is not None:
+                f.write(''.join(output))
+                f.flush()
+
+    def open(self, name):
+        if name not in self.files:
+            try:
+                self.files[name] = open(os.path.join(self.directory, name + '.log'), 'a')
+            except IOError:
+                self.files[name] = None
+        return self.files[name]
+
+    def close(self):
+        """Stop the thread, then write all the queued records."""
+        self.stopped = True
+        self.ready.set()
+        self.thread.join()
+        self.flush()
+        for f in self.files.values():
+            if f is not None:
+                f.close()
+
+
+class QueueHandler(logging.Handler):
+    """Handler that passes the records to the writer of this process as-is,
+    starting a new writer if the process was forked."""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.writer = None
+        self.pid = None
+
+    def emit(self, record):
+        if self.pid != os.getpid():
+            self.start()
+        self.writer.put(record)
+
+    def start(self):
+        self.pid = os.getpid()
+        self.writer = Writer()
+        # Also runs in worker processes as they exit, unlike `atexit`.
+        multiprocessing.util.Finalize(self.writer, self.writer.close, exitpriority = 10)
+
+
+handler = QueueHandler()
+loggers = set()
+
+
+def getLogger(name):
+    """Logger for the bot with this name, which writes to the queue."""
+    log = logging.getLogger(name)
+    if name not in loggers:
+        loggers.add(name)
+        log.addHandler(handler)
+        log.setLevel(level)
+    return log
+
+
+def configure(lvl):
+    """Change the level of the loggers of the bots in this process, which is
+    either a level from the `logging` module, its name, or `SILENT`."""
+    global level
+    if not isinstance(lvl, int):
+        lvl = SILENT if lvl.upper() == 'SILENT' else logging.getLevelName(lvl.upper())
+    level = lvl
+    for name in loggers:
+        logging.getLogger(name).setLevel(level)
@@ -19,6 +19,7 @@ from geventirc import message
 from competition import CompetitionRunner, CompetitionRound
 from player import Player, Bot
 from game import Game
+from record import GameRecord, RecordWriter
 
 
 RE_MAPPING = re.compile("([\w\-]*?)\s*[:=]\s*([\d\.]*?)\s*[,;$]")
@@ -42,7 +43,7 @@ def parseYesOrNo(text):
 class OnlineRound(CompetitionRound):
     
     def __init__(self, *args):
-        super(OnlineRound, self).__init__(*args)
+        super(OnlineRound, self).__init__(*args, record = GameRecord())
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H;%M;%S")
         self.file = open("logs/game_"+timestamp+".txt", "w")
 
@@ -87,6 +88,7 @@ class OnlineRound(CompetitionRound):
 
         super(OnlineRound, self).onGameComplete(win, spies)
         self.file.close()
+        OnlineRound.records.write(self.record)
 
 
 class ProxyBot(Bot):
@@ -167,7 +169,7 @@ class ProxyBot(Bot):
 
     def select(self, players, count):
         self._select = AsyncResult()
-        self.state.count = count
+        self.count = count
         self.expecting = self.process_SELECTED
 
         self.send('SELECT %i!' % (count))
@@ -186,8 +188,8 @@ class ProxyBot(Bot):
             msg = ' '.join(msg[1:])
         team = self.makeTeam(msg)
 
-        if len(team) != self.state.count:
-            self.send('SELECT %i?' % (self.state.count))
+        if len(team) != self.count:
+            self.send('SELECT %i?' % (self.count))
         else:
             assert self._select is not None
             self._select.set(team)
@@ -388,6 +390,7 @@ class ResistanceCompetitionHandler(CompetitionRunner):
                 self.client.msg('#resistance', 'TIMEOUT for game, took %0.2fs.' % (seconds))
             else:
                 self.client.msg('#resistance', 'PLAYED game in %0.2fs.' % (seconds))
+        OnlineRound.records.flush()
         self.show()
 
     def play(self, GameType, players, roles, channel):
@@ -396,13 +399,6 @@ class ResistanceCompetitionHandler(CompetitionRunner):
         self.games.append(g)
         g.run()
         self.games.remove(g)
-
-        for b in g.bots:
-            s = g.statistics.get(b.name)
-            if b.spy:
-                s.spyWins.sample(int(not g.won))
-            else:
-                s.resWins.sample(int(g.won))
         return g
 
     def _play(self, count, candidates, result):
@@ -607,6 +603,7 @@ if __name__ == '__main__':
 
     irc = Client(args.server, args.name,  port=args.port, local_hostname='localhost')
     OnlineRound.client = irc
+    OnlineRound.records = RecordWriter('logs/games.rec')
     h = ResistanceCompetitionHandler()
     irc.add_handler(h)
     try:
@@ -614,6 +611,8 @@ if __name__ == '__main__':
         irc.join()
     except KeyboardInterrupt:
         h.upcoming.put(([], None))
+    finally:
+        OnlineRound.records.close()
 
 
 # COMPETITION
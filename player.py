@@ -1,7 +1,5 @@
-import logging
-import logging.handlers
-
 import core
+import logger
 
 
 class Player(object):
@@ -31,15 +29,84 @@ class Player(object):
         return "%i-%s" % (self.index, self.name)
 
     def __eq__(self, other):
-        return self.index == other.index and self.name == other.name
+        return self is other or (self.index == other.index and self.name == other.name)
 
     def __ne__(self, other):
-        return self.index != other.index or self.name != other.name
+        return self is not other and (self.index != other.index or self.name != other.name)
 
     def __hash__(self):
-        return hash(self.index) ^ hash(self.name)
+        # The hash of the name depends on PYTHONHASHSEED, so the order of sets
+        # of players would differ between processes, e.g. when replaying.
+        return hash(self.index)
+
+
+class Handle(Player):
+    """Read-only Player that the game creates once for each seat at the table,
+    then shares with all the bots for the rest of the game.  Any Player or Bot
+    can be mapped to its handle as `game.players[player.index]`, so the game
+    engine doesn't need to copy players for every selection or announcement.
+    """
+
+    def __setattr__(self, name, value):
+        if 'index' in self.__dict__:
+            raise AttributeError("Player handles are read-only, can't set '%s'." % name)
+        super(Handle, self).__setattr__(name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError("Player handles are read-only, can't delete '%s'." % name)
+
+    def __reduce__(self):
+        return (Handle, (self.name, self.index))
+
 
+class Team(list):
+    """List of players selected for a mission, taken from the specified table
+    of players (indexed by seat) and stored in order of selection.  The team is
+    also tracked as a bitmask over the seats, so that checking if a player is
+    on the team does not require scanning the list.  The mask is kept up to
+    date if the bots change the list.
+    """
 
+    def __init__(self, table, players):
+        super(Team, self).__init__([table[p.index] for p in players])
+        self.table = table
+        self.update()
+
+    def update(self):
+        mask = 0
+        for p in self:
+            if isinstance(p, Player):
+                mask |= 1 << p.index
+        self.mask = mask
+
+    def __contains__(self, player):
+        if not isinstance(player, Player) or not 0 <= player.index < len(self.table):
+            return False
+        index = player.index
+        if not self.mask >> index & 1:
+            return False
+        # Players that were added to the list by hand may not be in the table.
+        return self.table[index] == player or list.__contains__(self, player)
+
+
+def changes(name):
+    """Wrap a function of list that modifies it, so the mask stays in sync."""
+    function = getattr(list, name)
+    def call(self, *args):
+        result = function(self, *args)
+        self.update()
+        return result
+    call.__name__ = name
+    return call
+
+for name in ['append', 'extend', 'insert', 'remove', 'pop', 'clear', '__setitem__', '__delitem__',
+             '__iadd__', '__imul__', '__setslice__', '__delslice__']:
+    if hasattr(list, name):
+        setattr(Team, name, changes(name))
+del name
+
+
+@core.observable
 class Bot(Player):
     """This is the base class for your AI in THE RESISTANCE.  To get started:
          1) Derive this class from a new file that will contain your AI.  See
@@ -61,9 +128,6 @@ class Bot(Player):
        folder, named according to your bot. 
     """
 
-    __metaclass__ = core.Observable
-
-
     def onGameRevealed(self, players, spies):
         """This function will be called to list all the players, and if you're
         a spy, the spies too -- including others and yourself.
@@ -176,6 +240,16 @@ class Bot(Player):
         """
         pass
 
+    def onReset(self):
+        """Callback when this bot is reused for another game rather than
+        created again, with self.index, self.spy and self.game already set for
+        the new game, and before onGameRevealed().  Bots don't have to support
+        this, but implementing it allows competitions to reuse them, in which
+        case anything kept from the previous game must be forgotten here or in
+        onGameRevealed().
+        """
+        pass
+
     def others(self):
         """Helper function to list players in the game that are not your bot."""
         return [p for p in self.game.players if p != self]
@@ -193,17 +267,23 @@ class Bot(Player):
         self.game = game
         self.spy = spy
 
-        self.log = logging.getLogger(self.name)
-        if not self.log.handlers:
-            try:
-                output = logging.FileHandler(filename='logs/'+self.name+'.log')
-                self.log.addHandler(output)
-                self.log.setLevel(logging.DEBUG)
-            except IOError:
-                pass
+        self.log = logger.getLogger(self.name)
 
     def __repr__(self):
         """Built-in function to support pretty-printing."""
         type = {True: "SPY", False: "RST"}
         return "<%s #%i %s>" % (self.name, self.index, type[self.spy])
 
+
+def resettable(cls):
+    """Whether the bots of this class implement Bot.onReset(), so they can be
+    reused from one game to the next, see `Game.reset()`."""
+    for c in cls.__mro__:
+        if c is Bot:
+            break
+        # The callbacks of observable classes are moved into their hooks.
+        hooks = c.__dict__.get('__hooks__')
+        if 'onReset' in (hooks if hooks is not None else c.__dict__):
+            return True
+    return False
+
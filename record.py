@@ -0,0 +1,240 @@
+"""Compact binary records of played games, for analysis without simulating
+the games again.
+
+A file of records is a sequence of segments, each one starting with its own
+table of the names of the bots so that segments encoded separately, e.g. by
+different worker processes, can simply be appended to the same file.  Every
+entry in a segment starts with a single byte for its type:
+
+    'S'     Start of a new segment, which clears the table of names.
+    'N'     Name of a bot: id (uint16), length (uint8), UTF-8 string of at
+            most 255 bytes.
+    'G'     Game: size (uint32) followed by the encoded `GameRecord`.
+
+All integers are little-endian.  Teams and votes are stored as bitmasks over
+the seats at the table, as in `State.teammask` and `State.votemask`.
+"""
+import io
+import struct
+
+
+MAGIC = b'RES\x01'
+
+SEGMENT, NAME, GAME = b'S', b'N', b'G'
+NAME_HEADER, GAME_HEADER = struct.Struct('<HB'), struct.Struct('<I')
+
+# Seed stored for games that were not seeded.
+NO_SEED = 2**64 - 1
+
+
+class GameRecord(object):
+    """Everything that happened in one game, built up from the callbacks of
+    the game as it's played.
+
+    `players` is the list of bot names by seat, `spies` a bitmask of the seats
+    of the spies, and `win` is True if the resistance won, False if the spies
+    won, or None if the game was aborted.  Each attempt at a mission is stored
+    as a tuple `(turn, tries, leader, team, votes, sabotages)` with the seat of
+    the leader, the team and votes as bitmasks, and the number of sabotages
+    or -1 if the team was not approved.  Announcements are stored as tuples
+    `(attempt, source, {seat: probability})` with the index of the attempt
+    that was last played."""
+
+    __slots__ = ('seed', 'players', 'spies', 'attempts', 'announcements', 'win')
+
+    HEADER = struct.Struct('<QBBHbH')
+    ATTEMPT = struct.Struct('<BBBHHb')
+    ANNOUNCEMENT = struct.Struct('<BBB')
+    ENTRY = struct.Struct('<Bf')
+
+    def __init__(self, seed = None, players = (), spies = 0):
+        self.seed = seed
+        self.players = list(players)
+        self.spies = spies
+        self.attempts = []
+        self.announcements = []
+        self.win = None
+
+    def vote(self, state):
+        self.attempts.append((state.turn, state.tries, state.leader.index,
+                              state.teammask, state.votemask, -1))
+
+    def mission(self, sabotaged):
+        self.attempts[-1] = self.attempts[-1][:5] + (sabotaged,)
+
+    def announce(self, source, announcement):
+        self.announcements.append((len(self.attempts) - 1, source.index,
+                                   dict((p.index, float(v)) for p, v in announcement.items())))
+
+    def complete(self, win):
+        self.win = win
+
+    def encode(self, names):
+        """Encode the game, given a function that returns the id of a name."""
+        seed = NO_SEED if self.seed is None else self.seed
+        win = -1 if self.win is None else int(self.win)
+        output = [self.HEADER.pack(seed, len(self.players), len(self.attempts),
+                                   self.spies, win, len(self.announcements))]
+        output.append(struct.pack('<%iH' % len(self.players), *[names(p) for p in self.players]))
+        for a in self.attempts:
+            output.append(self.ATTEMPT.pack(*a))
+        for attempt, source, values in self.announcements:
+            output.append(self.ANNOUNCEMENT.pack(attempt, source, len(values)))
+            for p, v in sorted(values.items()):
+                output.append(self.ENTRY.pack(p, v))
+        return b''.join(output)
+
+    @classmethod
+    def decode(cls, data, names):
+        """Decode a game, given the list of names by id."""
+        seed, count, attempts, spies, win, announcements = cls.HEADER.unpack_from(data, 0)
+        offset = cls.HEADER.size
+
+        r = cls(None if seed == NO_SEED else seed, spies = spies)
+        r.win = None if win < 0 else bool(win)
+        r.players = [names[i] for i in struct.unpack_from('<%iH' % count, data, offset)]
+        offset += 2 * count
+        for _ in range(attempts):
+            r.attempts.append(cls.ATTEMPT.unpack_from(data, offset))
+            offset += cls.ATTEMPT.size
+        for _ in range(announcements):
+            attempt, source, n = cls.ANNOUNCEMENT.unpack_from(data, offset)
+            offset += cls.ANNOUNCEMENT.size
+            values = {}
+            for _ in range(n):
+                p, v = cls.ENTRY.unpack_from(data, offset)
+                offset += cls.ENTRY.size
+                values[p] = v
+            r.announcements.append((attempt, source, values))
+        return r
+
+    def __eq__(self, other):
+        return all(getattr(self, k) == getattr(other, k) for k in self.__slots__)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return "<GameRecord %r spies=%s win=%r attempts=%i>" % (self.players, bin(self.spies), self.win, len(self.attempts))
+
+
+class Encoder(object):
+    """Encodes game records into a segment in memory, with its own table of
+    names, e.g. to send the games played by a worker back to the runner."""
+
+    def __init__(self):
+        self.start()
+
+    def start(self):
+        self.names = {}
+        self.buffer = [SEGMENT]
+        self.size = 1
+
+    def name(self, name):
+        i = self.names.get(name)
+        if i is None:
+            data = name.encode('utf-8')
+            if len(data) > 255:
+                raise ValueError("The name of bot %s... is too long to be recorded, at most 255 bytes in UTF-8." % name[:32])
+            i = self.names[name] = len(self.names)
+            self.append(NAME + NAME_HEADER.pack(i, len(data)) + data)
+        return i
+
+    def append(self, data):
+        self.buffer.append(data)
+        self.size += len(data)
+
+    def write(self, record):
+        data = record.encode(self.name)
+        self.append(GAME + GAME_HEADER.pack(len(data)) + data)
+
+    def __len__(self):
+        return self.size
+
+    def take(self):
+        """Return the encoded segment, and start a new one."""
+        data = b''.join(self.buffer)
+        self.start()
+        return data
+
+
+class RecordWriter(object):
+    """Append-only writer for a file of game records, which buffers at most
+    `capacity` bytes in memory before writing them out."""
+
+    CAPACITY = 1 << 20
+
+    def __init__(self, filename, capacity = CAPACITY):
+        self.file = io.open(filename, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.capacity = capacity
+        self.encoder = Encoder()
+
+    def write(self, record):
+        self.encoder.write(record)
+        if len(self.encoder) >= self.capacity:
+            self.flush()
+
+    def append(self, segment):
+        """Append a segment that was encoded separately."""
+        self.flush()
+        self.file.write(segment)
+
+    def flush(self):
+        if len(self.encoder) > 1:
+            self.file.write(self.encoder.take())
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def readEntry(f, header):
+    """Read the header of an entry, which ends with the size of its data, and
+    the data itself.  Returns None if the file ends before."""
+    data = f.read(header.size)
+    if len(data) < header.size:
+        return None
+    fields = header.unpack(data)
+    data = f.read(fields[-1])
+    if len(data) < fields[-1]:
+        return None
+    return fields, data
+
+
+def read(filename):
+    """Iterate over all the games stored in a file, one at a time.  An entry
+    that was cut short at the end of the file, e.g. when the writer crashed,
+    is ignored."""
+    with io.open(filename, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not a file of game records." % filename)
+
+        names = []
+        while True:
+            kind = f.read(1)
+            if not kind:
+                break
+            if kind == GAME:
+                entry = readEntry(f, GAME_HEADER)
+                if entry is None:
+                    break
+                yield GameRecord.decode(entry[1], names)
+            elif kind == NAME:
+                entry = readEntry(f, NAME_HEADER)
+                if entry is None:
+                    break
+                assert entry[0][0] == len(names), "Names in a segment are stored in order."
+                names.append(entry[1].decode('utf-8'))
+            elif kind == SEGMENT:
+                names = []
+            else:
+                raise ValueError("Unknown entry %r in %s." % (kind, filename))
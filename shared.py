@@ -0,0 +1,200 @@
+"""Statistics that learning bots share between all the worker processes of a
+competition, so each bot learns from all the games rather than only those
+played in its own process.
+
+A bot opts in by storing its counters in a `Statistics` object, typically as
+a class attribute, instead of its own dictionaries:
+
+    class Learner(Bot):
+        statistics = shared.Statistics('Learner')
+
+        def onVoteComplete(self, votes):
+            self.statistics.sample((self.game.leader.name, 'approved'), int(...))
+
+The counters are read from a copy in each process, so reading them costs no
+more than a dictionary lookup.  The samples are sent to a `Server` in batches
+between games every `INTERVAL` seconds, and the changes made by the other
+processes since are received in return.
+Without a server, e.g. in a single process, the counters are only local.
+"""
+import time
+import threading
+import multiprocessing
+from multiprocessing.managers import BaseManager
+
+
+class Statistics(object):
+    """Counters of samples by key for one learning bot, given a unique name.
+    Each counter stores the total of the values sampled and their number."""
+
+    def __init__(self, name):
+        self.name = name
+        self.counters = {}
+        # Samples since the last synchronization, to send to the server.
+        self.pending = {}
+        stores[name] = self
+
+    def sample(self, key, value):
+        for counters in (self.counters, self.pending):
+            c = counters.get(key)
+            if c is None:
+                c = counters[key] = [0.0, 0]
+            c[0] += value
+            c[1] += 1
+
+    def get(self, key):
+        """Total and number of samples for this key."""
+        c = self.counters.get(key)
+        return (c[0], c[1]) if c is not None else (0.0, 0)
+
+    def estimate(self, key, default = 0.5):
+        """Average of the samples for this key, or the default if none."""
+        c = self.counters.get(key)
+        if c is None or c[1] == 0:
+            return default
+        return float(c[0]) / float(c[1])
+
+    def clear(self):
+        self.counters.clear()
+        self.pending.clear()
+
+    def __deepcopy__(self, memo):
+        # Shared by the whole process rather than copied with the bots, and
+        # cleared explicitly along with the connection, see `reset()`.
+        return self
+
+    def __repr__(self):
+        return "<Statistics %s keys=%i>" % (self.name, len(self.counters))
+
+
+class Store(object):
+    """Counters of all the learning bots, held by the server process.  Each key
+    has the version when it was last changed, so that processes only receive
+    the counters that changed since they last synchronized."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.versions = {}
+        self.version = 0
+
+    def synchronize(self, samples, since):
+        """Add the samples from one process, and return the current version
+        along with the counters that changed after the given version."""
+        with self.lock:
+            if samples:
+                self.version += 1
+                for key, (total, count) in samples.items():
+                    c = self.counters.get(key)
+                    if c is None:
+                        c = self.counters[key] = [0.0, 0]
+                    c[0] += total
+                    c[1] += count
+                    self.versions[key] = self.version
+            changed = dict((k, tuple(self.counters[k])) for k, v in self.versions.items() if v > since)
+            return self.version, changed
+
+
+store = None
+
+
+def getStore():
+    global store
+    if store is None:
+        store = Store()
+    return store
+
+
+class StoreManager(BaseManager):
+    pass
+
+StoreManager.register('Store', callable = getStore)
+
+
+def ignore():
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class Server(object):
+    """Process that holds the shared statistics for the workers, which
+    connect to its `address`.  By default only the workers on this machine
+    can connect, otherwise the server listens on the given TCP address, e.g.
+    `(host, 0)` for any port, with the key of the remote workers.  The same
+    server can be passed to successive competitions for the bots to keep
+    learning."""
+
+    def __init__(self, address = None, authkey = None):
+        authkey = bytes(authkey or multiprocessing.current_process().authkey)
+        self.manager = StoreManager(address = address, authkey = authkey)
+        self.manager.start(ignore)
+        self.address = (self.manager.address, authkey)
+
+    def shutdown(self):
+        self.manager.shutdown()
+
+
+# Maximum delay in seconds between synchronizations with the server.
+INTERVAL = 0.05
+
+# Statistics created in this process by name, and the server they're shared
+# with as (address, proxy, version of the last synchronization).
+stores = {}
+connection = None
+synchronized = 0.0
+
+# Host of the runner for remote workers, see `distributed.work()`, which is
+# used in place of a server listening on all interfaces.
+coordinator = None
+WILDCARDS = ('', '0.0.0.0', '::')
+
+
+def connect(address):
+    """Share the statistics of this process with the server at this address,
+    as given by `Server.address`, unless they're already shared."""
+    global connection
+    if connection is not None and connection[0] == address:
+        return
+    reset()
+    location = address[0]
+    if isinstance(location, tuple) and location[0] in WILDCARDS and coordinator is not None:
+        location = (coordinator, location[1])
+    manager = StoreManager(address = location, authkey = address[1])
+    manager.connect()
+    connection = (address, manager.Store(), 0)
+
+
+def reset():
+    """Forget all the statistics in this process, and stop sharing them."""
+    global connection
+    connection = None
+    for s in stores.values():
+        s.clear()
+
+
+def update():
+    """Synchronize with the server if it's been long enough since last time."""
+    if connection is not None and time.time() - synchronized >= INTERVAL:
+        synchronize()
+
+
+def synchronize():
+    """Send the samples of this process to the server, and update the
+    statistics with the changes from the other processes."""
+    global connection, synchronized
+    if connection is None:
+        return
+    synchronized = time.time()
+    address, proxy, since = connection
+    samples = {}
+    for s in stores.values():
+        for key, c in s.pending.items():
+            samples[(s.name, key)] = c
+        s.pending = {}
+
+    version, changed = proxy.synchronize(samples, since)
+    for (name, key), (total, count) in changed.items():
+        s = stores.get(name)
+        if s is not None:
+            s.counters[key] = [total, count]
+    connection = (address, proxy, version)
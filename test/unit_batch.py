@@ -0,0 +1,77 @@
+import os
+import sys
+import math
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The tools and the cheaters are imported as when run from the command line.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ('tools', 'bots'):
+    if os.path.join(ROOT, directory) not in sys.path:
+        sys.path.append(os.path.join(ROOT, directory))
+
+from competition import CompetitionRunner, StatisticsTable, play, RES_WINS, SPY_WINS, TIMEOUTS
+from bots.beginners import Paranoid, Hippie, RandomBot, RuleFollower
+from cheaters import RandomCheater
+
+
+COMPETITORS = [Paranoid, Hippie, RandomBot, RuleFollower, RandomCheater]
+
+
+@unittest.skipIf(numpy is None, "The batch engine requires numpy.")
+class TestBatch(unittest.TestCase):
+
+    GAMES = 2000
+
+    @classmethod
+    def setUpClass(cls):
+        from batch import BatchRunner
+        runner = BatchRunner(COMPETITORS, cls.GAMES, quiet = True, seed = 11)
+        runner.main()
+        cls.batch = runner.statistics
+
+        # The same lineups and roles played by the bots themselves.
+        cls.games = StatisticsTable()
+        for args in CompetitionRunner(COMPETITORS, cls.GAMES, quiet = True, seed = 11).listGames():
+            play(args, cls.games)
+
+    def counters(self, table, name, column):
+        o = table.row(name) + column
+        return table.counters[o], table.counters[o+1]
+
+    def test_RolesAndGamesAreCounted(self):
+        for bot in COMPETITORS:
+            name = bot.__name__
+            for column in (RES_WINS, SPY_WINS):
+                self.assertEqual(self.counters(self.batch, name, column)[1], self.counters(self.games, name, column)[1])
+            self.assertEqual(self.counters(self.batch, name, TIMEOUTS), (0.0, self.games[name].total().samples))
+
+    def test_ColumnsMatchGames(self):
+        for bot in COMPETITORS:
+            name = bot.__name__
+            for column in range(RES_WINS, TIMEOUTS, 2):
+                (a, n), (b, m) = self.counters(self.batch, name, column), self.counters(self.games, name, column)
+                if min(n, m) < 200:
+                    continue
+                # Same number of samples and rate within the error bars, which
+                # are widened since samples in a game are correlated.
+                p, q = a / n, b / m
+                error = 3.0 * math.sqrt(max(p * (1 - p), 0.01) * (1.0 / n + 1.0 / m))
+                self.assertTrue(abs(n - m) < 0.1 * m, "%s column %i: %i samples, expected %i." % (name, column, n, m))
+                self.assertTrue(abs(p - q) < error + 0.02, "%s column %i: %.3f, expected %.3f." % (name, column, p, q))
+
+    def test_WinRatesMatchGames(self):
+        for bot in COMPETITORS:
+            name = bot.__name__
+            batch, games = self.batch[name], self.games[name]
+            for role in ('resWins', 'spyWins'):
+                p, q = getattr(batch, role).estimate(), getattr(games, role).estimate()
+                self.assertTrue(abs(p - q) < 0.06, "%s %s: %.3f, expected %.3f." % (name, role, p, q))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,398 @@
+import os
+import sys
+import time
+import random
+import array
+import unittest
+import subprocess
+import collections
+
+import record
+from competition import CompetitionRunner, StatisticsTable, WorkerPool, RES_WINS, SPY_WINS, play, play_batch, lineupKey
+from game import Game, Budget, BudgetExceeded, oracle
+from bots.intermediates import Simpleton, Bounder, Logicalton
+from bots.beginners import Hippie
+from util import Variable, Latency
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestStatisticsTable(unittest.TestCase):
+
+    def setUp(self):
+        self.table = StatisticsTable(['A', 'B'])
+        self.table.sample(self.table.row('A') + RES_WINS, 1)
+        self.table.sample(self.table.row('B') + SPY_WINS, 0)
+
+    def test_SampleUpdatesMetric(self):
+        self.assertEqual(self.table['A'].resWins.total, 1)
+        self.assertEqual(self.table['A'].resWins.samples, 1)
+        self.assertEqual(self.table['B'].spyWins.samples, 1)
+        self.assertEqual(self.table['B'].total().estimate(), 0.0)
+
+    def test_MetricWritesBack(self):
+        stats = self.table['A']
+        stats.resWins.sample(0)
+        stats.spyWins += Variable(2, 3)
+        self.assertEqual((stats.resWins.total, stats.resWins.samples), (1, 2))
+        self.assertEqual((stats.spyWins.total, stats.spyWins.samples), (2, 3))
+        self.assertEqual(self.table.counters[self.table.row('A') + SPY_WINS + 1], 3)
+        self.assertEqual(self.table['B'].spyWins.samples, 1)
+
+    def test_MergeAlignsRowsByName(self):
+        other = StatisticsTable(['C', 'A'])
+        other.sample(other.row('A') + RES_WINS, 1)
+        other.sample(other.row('C') + SPY_WINS, 1)
+
+        self.table += other
+        self.assertEqual(list(self.table), ['A', 'B', 'C'])
+        self.assertEqual(self.table['A'].resWins.total, 2)
+        self.assertEqual(self.table['A'].resWins.samples, 2)
+        self.assertEqual(self.table['C'].spyWins.total, 1)
+        self.assertEqual(self.table['B'].spyWins.samples, 1)
+
+
+class TestPlayBatch(unittest.TestCase):
+
+    def test_ResultsAggregatedPerBatch(self):
+        players = (Simpleton, Bounder, Simpleton, Bounder, Simpleton)
+        roles = (True, True, False, False, False)
+        count, elapsed, statistics, timings, error, records = play_batch([(players, roles, True, None)] * 4)
+
+        self.assertEqual(count, 4)
+        self.assertEqual(error, None)
+        self.assertEqual(sorted(statistics), ['Bounder', 'Simpleton'])
+        self.assertEqual(statistics['Simpleton'].total().samples, 12)
+        self.assertEqual(statistics['Bounder'].total().samples, 8)
+
+    def test_ResultsSplitPerLineup(self):
+        first = (Simpleton, Bounder, Simpleton, Bounder, Simpleton)
+        second = (Bounder, Simpleton, Bounder, Simpleton, Simpleton)
+        roles = (True, True, False, False, False)
+        batch = [(first, roles, True, None), (second, roles, True, None), (first[:4] + (Logicalton,), roles, True, None)]
+        count, elapsed, statistics, timings, error, records = play_batch(batch, split = True)
+
+        self.assertEqual(sorted(statistics), sorted([lineupKey(first), lineupKey(first[:4] + (Logicalton,))]))
+        self.assertEqual(statistics[lineupKey(first)]['Simpleton'].total().samples, 6)
+        self.assertEqual(statistics[lineupKey(second)].scaled(0.5)['Bounder'].total().samples, 2)
+
+    def test_WeightedKeepsSamples(self):
+        first, second = StatisticsTable(), StatisticsTable()
+        for _ in range(10):
+            first['Simpleton'].sample(RES_WINS, 1)
+        for _ in range(30):
+            second['Simpleton'].sample(RES_WINS, 0)
+            second['Bounder'].sample(SPY_WINS, 1)
+
+        table = StatisticsTable.weighted([first, second], [3.0, 1.0])
+        self.assertEqual((table['Simpleton'].resWins.total, table['Simpleton'].resWins.samples), (20.0, 40))
+        self.assertEqual((table['Bounder'].spyWins.total, table['Bounder'].spyWins.samples), (30.0, 30))
+
+
+class TestGameSelections(unittest.TestCase):
+
+    def test_EachRoundCoversAllPermutations(self):
+        competitors = [type('Bot%i' % i, (Simpleton,), {}) for i in range(6)]
+        total = 6 * 5 * 4 * 3 * 2 * 10
+        runner = CompetitionRunner(competitors, total + 10, quiet = True)
+        games = list(runner.listGameSelections())
+
+        self.assertEqual(len(games), total + 10)
+        self.assertEqual(len(set(games[:total])), total)
+
+    def test_PartialRoundsAreSpread(self):
+        competitors = [type('Bot%i' % i, (Simpleton,), {}) for i in range(8)]
+        for seed in range(5):
+            games = list(CompetitionRunner(competitors, 80, quiet = True, seed = seed).listGameSelections())
+            leaders = collections.Counter([p[0] for p, _ in games])
+            players = collections.Counter([b for p, _ in games for b in p])
+            self.assertEqual(len(leaders), 8)
+            self.assertTrue(max(leaders.values()) - min(leaders.values()) <= 2)
+            self.assertTrue(min(players.values()) >= 30)
+
+    def test_LargerTables(self):
+        competitors = [type('Bot%i' % i, (Simpleton,), {}) for i in range(8)]
+        runner = CompetitionRunner(competitors, 100, quiet = True, players = 7)
+        games = list(runner.listGameSelections())
+
+        self.assertEqual(len(set(games)), 100)
+        self.assertTrue(all([len(p) == 7 and sum(r) == 3 for p, r in games]))
+        statistics = play(next(runner.listGames()))
+        self.assertEqual(sum([s.total().samples for _, s in statistics.items()]), 7)
+
+    def test_SeedMakesGamesReproducible(self):
+        competitors = [Simpleton, Bounder]
+        first = list(CompetitionRunner(list(competitors), 20, quiet = True, seed = 7).listGames())
+        second = list(CompetitionRunner(list(competitors), 20, quiet = True, seed = 7).listGames())
+        self.assertEqual(first, second)
+
+        results = [play(first[11]).counters for _ in range(2)]
+        self.assertEqual(results[0], results[1])
+
+    def test_GamesIndependentOfHashSeed(self):
+        # Replays run in another process, where the hashes of strings differ.
+        script = ("import sys; sys.path.append('bots')\n"
+                  "from competition import play\n"
+                  "from cheaters import RandomCheater\n"
+                  "from bots.beginners import Paranoid, RandomBot\n"
+                  "for seed in range(20):\n"
+                  "    print(play(((RandomCheater, Paranoid, RandomCheater, RandomBot, Paranoid), (True, False, True, False, False), True, seed)).counters.tolist())\n")
+        outputs = []
+        for hashseed in ('1', '2'):
+            env = dict(os.environ, PYTHONHASHSEED = hashseed)
+            outputs.append(subprocess.check_output([sys.executable, '-c', script], env = env, cwd = ROOT))
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_SeedsFitInRecords(self):
+        runner = CompetitionRunner([Simpleton, Bounder], 10, quiet = True, seed = CompetitionRunner.SEEDS - 1)
+        self.assertTrue(runner.gameSeed(2**32 - 1) < record.NO_SEED)
+        self.assertRaises(ValueError, CompetitionRunner, [Simpleton, Bounder], 10, seed = 2**32)
+
+    def test_AdaptiveFocusesOnCloseBots(self):
+        competitors = [type('Bot%i' % i, (Simpleton,), {}) for i in range(6)]
+        runner = CompetitionRunner(competitors, 1000, quiet = True, adaptive = True)
+        for c, wins in zip(competitors, [900, 700, 500, 490, 300, 100]):
+            o = runner.statistics.row(c.__name__)
+            runner.statistics.counters[o + RES_WINS:o + RES_WINS + 2] = array.array('d', [wins, 1000])
+
+        self.assertEqual(runner.unsettled(), set(['Bot2', 'Bot3']))
+        lineup = runner.lineup(runner.unsettled())
+        self.assertEqual(sorted([c.__name__ for c in lineup]), ['Bot0', 'Bot1', 'Bot2', 'Bot3', 'Bot4'])
+        self.assertEqual(runner.lineup(set()), [])
+
+
+class TestProfile(unittest.TestCase):
+
+    def test_LatencyPercentiles(self):
+        l = Latency()
+        for _ in range(99):
+            l.sample(0.001)
+        l.sample(0.5)
+        self.assertEqual(l.count, 100)
+        self.assertEqual(l.maximum, 0.5)
+        self.assertTrue(0.001 <= l.percentile(0.5) < 0.0012)
+        self.assertEqual(l.percentile(1.0), 0.5)
+
+    def test_GameCallsAreTimed(self):
+        profile = collections.defaultdict(Latency)
+        players = (Simpleton, Bounder, Simpleton, Bounder, Simpleton)
+        play((players, (True, True, False, False, False), True, 1), profile = profile)
+
+        self.assertEqual(profile[('Bounder', 'onGameRevealed')].count, 2)
+        self.assertEqual(profile[('Simpleton', 'onGameComplete')].count, 3)
+        votes = profile[('Simpleton', 'vote')].count + profile[('Bounder', 'vote')].count
+        self.assertEqual(votes % 5, 0)
+        self.assertTrue(votes > 0)
+
+
+class TestReuse(unittest.TestCase):
+
+    def test_ResetKeepsResettableBots(self):
+        g = Game((Simpleton, Hippie, Bounder, Logicalton, Simpleton), (True, True, False, False, False))
+        g.run()
+        bots, handles = list(g.bots), list(g.state.players)
+
+        g.reset((False, True, False, True, False), seating = [4, 1, 2, 3, 0])
+        self.assertTrue(g.bots[0] is bots[4] and g.bots[4] is bots[0] and g.bots[2] is bots[2])
+        self.assertFalse(g.bots[1] is bots[1])
+        self.assertEqual([(b.index, b.spy) for b in g.bots], [(0, False), (1, True), (2, False), (3, True), (4, False)])
+        self.assertTrue(g.state.players[2] is handles[2])
+        self.assertEqual((g.state.turn, g.state.wins, g.state.losses, g.state.leader), (1, 0, 0, handles[0]))
+        self.assertEqual(g.spies, set([handles[1], handles[3]]))
+        g.run()
+        self.assertTrue(g.done)
+
+    def test_ReusedGamesMatchNewGames(self):
+        competitors = [Simpleton, Bounder, Logicalton, Hippie, type('Other', (Simpleton,), {}), type('Last', (Bounder,), {})]
+        games = list(CompetitionRunner(competitors, 40, quiet = True, seed = 3).listGames())
+        fresh, reused = StatisticsTable(), StatisticsTable()
+        cache = {}
+        for args in games:
+            play(args, fresh)
+            play(args, reused, games = cache)
+        self.assertEqual(fresh.counters, reused.counters)
+        self.assertTrue(0 < len(cache) < len(games))
+
+
+class Witness(Simpleton):
+
+    def onGameRevealed(self, players, spies):
+        super(Witness, self).onGameRevealed(players, spies)
+        self.revealed = set(spies)
+
+
+@oracle
+class Oracle(Witness):
+    pass
+
+
+class Impostor(Oracle):
+    pass
+
+
+class TestOracle(unittest.TestCase):
+
+    def test_OnlyOraclesKnowTheSpies(self):
+        g = Game((Oracle, Witness, Impostor, Witness, Oracle), (True, False, False, True, False))
+        g.run()
+        spies = set([g.state.players[0], g.state.players[3]])
+        self.assertEqual([b.revealed for b in g.bots], [spies, set(), set(), spies, spies])
+
+
+class Runaway(Simpleton):
+
+    def vote(self, team):
+        while True:
+            pass
+
+
+class LateRunaway(Simpleton):
+    """Only runs away from its second game, for up to a few seconds."""
+
+    games = 0
+
+    def onGameRevealed(self, players, spies):
+        super(LateRunaway, self).onGameRevealed(players, spies)
+        LateRunaway.games += 1
+
+    def vote(self, team):
+        t = time.time()
+        while LateRunaway.games > 1 and time.time() - t < 5.0:
+            pass
+        return super(LateRunaway, self).vote(team)
+
+
+class Slowpoke(Simpleton):
+
+    def vote(self, team):
+        time.sleep(0.02)
+        return super(Slowpoke, self).vote(team)
+
+
+class TestBudget(unittest.TestCase):
+
+    def test_RunawayBotAbortsBatch(self):
+        players = (Simpleton, Bounder, Runaway, Bounder, Simpleton)
+        roles = (True, True, False, False, False)
+        batch = [(players, roles, True, None)] * 3
+        count, elapsed, statistics, timings, error, records = play_batch(batch, budget = Budget(call = 0.05))
+
+        self.assertEqual(count, 1)
+        self.assertEqual((error.name, error.index, error.function), ('Runaway', 2, 'vote'))
+        self.assertEqual(statistics['Runaway'].timeouts.total, 1)
+        self.assertEqual(statistics['Bounder'].timeouts.total, 0)
+        self.assertEqual(statistics['Bounder'].timeouts.samples, 2)
+        self.assertEqual(statistics['Runaway'].total().samples, 0)
+
+    def test_ReusedGameIsInterrupted(self):
+        # The game of the second lineup takes over the timer signal, which
+        # must be sent to the first game again when it's reused.
+        first = (Simpleton, Bounder, LateRunaway, Bounder, Simpleton)
+        second = (Simpleton, Bounder, Hippie, Bounder, Simpleton)
+        roles = (True, True, False, False, False)
+        batch = [(first, roles, True, None), (second, roles, True, None), (first, roles, True, None)]
+        LateRunaway.games = 0
+        count, elapsed, statistics, timings, error, records = play_batch(batch, budget = Budget(call = 0.05))
+
+        self.assertEqual(count, 3)
+        self.assertEqual((error.name, error.function), ('LateRunaway', 'vote'))
+        self.assertTrue(error.elapsed < 1.0)
+
+    def test_BudgetNeedsALimit(self):
+        self.assertRaises(ValueError, Budget)
+        self.assertRaises(ValueError, Budget, cpu = True)
+
+    def test_GameBudgetIsShared(self):
+        players = (Simpleton, Bounder, Simpleton, Bounder, Simpleton)
+        roles = (True, True, False, False, False)
+        statistics = play((players, roles, True, None), budget = Budget(call = 1.0, game = 1.0))
+        self.assertEqual(statistics['Simpleton'].timeouts.samples, 3)
+        self.assertEqual(statistics['Simpleton'].timeouts.total, 0)
+
+        # Each vote is well within the limit for a call, but not all of them.
+        players = (Simpleton, Bounder, Slowpoke, Bounder, Simpleton)
+        try:
+            play((players, roles, True, None), budget = Budget(call = 1.0, game = 0.05))
+            self.fail("The game budget wasn't enforced.")
+        except BudgetExceeded as e:
+            self.assertEqual((e.name, e.index, e.function), ('Slowpoke', 2, 'vote'))
+            self.assertTrue(e.elapsed < 0.5)
+
+
+class Sleeper(Simpleton):
+
+    def vote(self, team):
+        time.sleep(1.0)
+        return super(Sleeper, self).vote(team)
+
+
+class Impatient(CompetitionRunner):
+
+    def patience(self, games):
+        return 0.2
+
+
+class TestPatience(unittest.TestCase):
+
+    def test_SkippedGamesAreReported(self):
+        runner = Impatient([Sleeper, Simpleton], 3, quiet = True)
+        runner.main()
+        self.assertEqual(runner.skipped, 3)
+        self.assertEqual(len(runner.statistics), 0)
+
+
+class Learner(Simpleton):
+    games = [0]
+    rate = 0.0
+
+    def onGameComplete(self, win, spies):
+        self.games[0] += 1
+
+
+def learned():
+    return Learner.games[0], Learner.rate
+
+
+def configure(rate):
+    Learner.rate = rate
+
+
+class TestWorkerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = WorkerPool([Learner], processes = 1)
+
+    def tearDown(self):
+        self.pool.close()
+        self.pool.join()
+
+    def play(self, games):
+        runner = CompetitionRunner([Learner], games, quiet = True, pool = self.pool)
+        runner.main()
+        return self.pool.apply_async(learned).get(10)
+
+    def test_WarmupIsForgotten(self):
+        state = random.getstate()
+        Learner.games[0] = 0
+        CompetitionRunner([Learner], 10, quiet = True, validate = False, seed = 5).warmup()
+        self.assertEqual(Learner.games[0], 0)
+        self.assertEqual(random.getstate(), state)
+
+    def test_StateResetBetweenCompetitions(self):
+        self.assertEqual(self.play(10), (50, 0.0))
+        self.assertEqual(self.play(10), (50, 0.0))
+
+    def test_StateKeptBetweenCompetitions(self):
+        self.pool.keep = True
+        self.pool.configure(configure, 0.5)
+        self.assertEqual(self.play(10), (50, 0.5))
+        self.assertEqual(self.play(10), (100, 0.5))
+
+        self.pool.reset()
+        self.assertEqual(self.pool.apply_async(learned).get(10), (0, 0.5))
+        self.assertEqual(Learner.games[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
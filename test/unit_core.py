@@ -0,0 +1,71 @@
+import unittest
+
+from core import Observable
+
+
+def base_onEvent(self, value):
+    self.calls.append(('Bot', value))
+
+
+Bot = Observable('Bot', (object,), {'onEvent': base_onEvent, 'onOther': lambda self: None})
+
+
+class TestObservable(unittest.TestCase):
+
+    def setUp(self):
+        def first(self, value):
+            self.calls.append(('First', value))
+        def second(self, value):
+            self.calls.append(('Second', value))
+
+        self.First = Observable('First', (Bot,), {'onEvent': first})
+        self.Second = Observable('Second', (self.First,), {'onEvent': second})
+
+    def test_ObserversCalledInOrder(self):
+        bot = self.Second()
+        bot.calls = []
+        bot.onEvent(1)
+        self.assertEqual(bot.calls, [('First', 1), ('Second', 1), ('Bot', 1)])
+
+    def test_BaseClassOnlyCallsItsObservers(self):
+        bot = self.First()
+        bot.calls = []
+        bot.onEvent(2)
+        self.assertEqual(bot.calls, [('First', 2), ('Bot', 2)])
+
+    def test_SuperCallsEachObserverOnce(self):
+        def third(self, value):
+            super(Third, self).onEvent(value)
+            self.calls.append(('Third', value))
+
+        Third = Observable('Third', (self.Second,), {'onEvent': third})
+        Fourth = Observable('Fourth', (Third,), {})
+        for cls in (Third, Fourth):
+            bot = cls()
+            bot.calls = []
+            bot.onEvent(3)
+            self.assertEqual(bot.calls, [('First', 3), ('Second', 3), ('Third', 3), ('Bot', 3)])
+
+    def test_NoObserversSkipsDispatch(self):
+        self.assertIs(self.Second.__dict__['onOther'], Bot.__dict__['onOther'])
+
+    def test_BotsAreObservable(self):
+        import player
+
+        class Revealing(player.Bot):
+            def onGameRevealed(self, players, spies):
+                self.calls.append('Revealing')
+
+        class Derived(Revealing):
+            def onGameRevealed(self, players, spies):
+                self.calls.append('Derived')
+
+        self.assertTrue(isinstance(player.Bot, Observable))
+        bot = Derived.__new__(Derived)
+        bot.calls = []
+        bot.onGameRevealed([], [])
+        self.assertEqual(bot.calls, ['Revealing', 'Derived'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import time
+import threading
+import unittest
+import multiprocessing
+from multiprocessing.connection import Client
+
+from competition import CompetitionRunner, play_batch
+from distributed import RemotePool, work, launch, parseAddress, generateKey, RETRIES
+from bots.intermediates import Simpleton, Bounder
+
+
+AUTHKEY = generateKey()
+
+
+class TestRemotePool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = RemotePool(('localhost', 0), ['bots/intermediates.py'], AUTHKEY)
+        self.workers = []
+
+    def tearDown(self):
+        self.pool.close()
+        for p in self.workers:
+            p.join(10)
+        self.pool.join()
+
+    def connect(self):
+        p = multiprocessing.Process(target = work, args = (self.pool.address, AUTHKEY))
+        p.start()
+        self.workers.append(p)
+
+    def test_ParseAddress(self):
+        self.assertEqual(parseAddress('localhost:4200'), ('localhost', 4200))
+        self.assertEqual(parseAddress('4200'), ('localhost', 4200))
+        self.assertEqual(parseAddress(':4200'), ('localhost', 4200))
+        self.assertEqual(parseAddress('/tmp/resistance.sock'), '/tmp/resistance.sock')
+
+    def test_LostWorkerBatchIsRequeued(self):
+        players = (Simpleton, Bounder, Simpleton, Bounder, Simpleton)
+        roles = (True, True, False, False, False)
+        result = self.pool.apply_async(play_batch, ([(players, roles, True, None)] * 4,))
+
+        lost = Client(self.pool.address, authkey = AUTHKEY)
+        self.assertEqual(lost.recv()[0], 'setup')
+        self.assertEqual(lost.recv()[0], 'call')
+        lost.close()
+
+        self.connect()
+        count, elapsed, statistics, timings, error, records = result.get(30)
+        self.assertEqual(count, 4)
+        self.assertEqual(statistics['Simpleton'].total().samples, 12)
+
+    def test_SilentWorkerBatchIsRequeued(self):
+        self.pool.timeout = 1.0
+        players = (Simpleton, Bounder, Simpleton, Bounder, Simpleton)
+        roles = (True, True, False, False, False)
+        result = self.pool.apply_async(play_batch, ([(players, roles, True, None)] * 4,))
+
+        # Connected but never answers, as if its machine went away.
+        silent = Client(self.pool.address, authkey = AUTHKEY)
+        self.assertEqual(silent.recv()[0], 'setup')
+        self.assertEqual(silent.recv()[0], 'call')
+
+        self.connect()
+        count, elapsed, statistics, timings, error, records = result.get(30)
+        self.assertEqual(count, 4)
+        silent.close()
+
+    def test_CallFailsAfterLosingWorkers(self):
+        result = self.pool.apply_async(time.sleep, (0.0,))
+        for _ in range(RETRIES + 1):
+            lost = Client(self.pool.address, authkey = AUTHKEY)
+            self.assertEqual(lost.recv()[0], 'setup')
+            self.assertEqual(lost.recv()[0], 'call')
+            lost.close()
+        self.assertRaises(EOFError, result.get, 30)
+
+    def test_FailedSetupIsNotRestarted(self):
+        self.pool.specs = ['no_such_bots']
+        thread = threading.Thread(target = launch, args = (self.pool.address, 1, AUTHKEY))
+        thread.daemon = True
+        thread.start()
+        thread.join(30)
+        self.assertFalse(thread.is_alive())
+
+    def test_HeartbeatKeepsSlowWorker(self):
+        self.pool.timeout = 0.4
+        result = self.pool.apply_async(time.sleep, (1.0,))
+        self.connect()
+        self.assertEqual(result.get(30), None)
+
+    def test_RunnerPlaysAllGames(self):
+        self.connect()
+        for _ in range(2):
+            runner = CompetitionRunner([Simpleton, Bounder], 50, quiet = True, pool = self.pool)
+            runner.main()
+            self.assertEqual(sum([s.total().samples for _, s in runner.statistics.items()]), 250)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,10 @@
 import unittest
 
 import random
+import itertools
 
-from player import Player
-from game import State, BaseGame
+from player import Player, Handle, Team
+from game import State, BaseGame, Model, Rules
 
 
 class FakeGame(BaseGame):
@@ -52,6 +53,69 @@ class FakeGame(BaseGame):
         return data
 
 
+class TestState(unittest.TestCase):
+
+    def setUp(self):
+        self.state = State()
+        self.state.players = [Player("Mock", i) for i in range(5)]
+        self.state.leader = self.state.players[0]
+
+    def test_TeamAndVoteMasks(self):
+        self.state.team = self.state.players[1:3]
+        self.state.votes = [True, False, True, False, False]
+        self.assertEqual(self.state.teammask, 0b00110)
+        self.assertEqual(self.state.votemask, 0b00101)
+
+    def test_CloneIsEqualAndIndependent(self):
+        self.state.team = self.state.players[0:2]
+        clone = self.state.clone()
+        self.assertEqual(clone, self.state)
+        self.assertEqual(hash(clone), hash(self.state))
+
+        clone.team = self.state.players[2:4]
+        self.assertNotEqual(clone, self.state)
+        self.assertEqual(self.state.teammask, 0b00011)
+
+
+class TestTeam(unittest.TestCase):
+
+    def setUp(self):
+        self.players = [Handle("Mock%i" % i, i) for i in range(5)]
+
+    def test_MembershipUsesMask(self):
+        team = Team(self.players, [Player("Mock3", 3), self.players[1]])
+        self.assertEqual(team.mask, 0b01010)
+        self.assertIs(team[0], self.players[3])
+        self.assertIn(Player("Mock1", 1), team)
+        self.assertNotIn(Player("Other", 1), team)
+        self.assertNotIn(self.players[0], team)
+
+    def test_MembershipOfOtherObjects(self):
+        team = Team(self.players, [self.players[1]])
+        self.assertNotIn(None, team)
+        self.assertNotIn("Mock1", team)
+        self.assertNotIn(Player("Mock1", -4), team)
+        self.assertNotIn(Player("Mock1", 5), team)
+
+    def test_MaskFollowsChanges(self):
+        team = Team(self.players, [self.players[1]])
+        team.append(self.players[2])
+        team += [self.players[4]]
+        team.remove(self.players[1])
+        self.assertEqual(team.mask, 0b10100)
+        self.assertIn(self.players[2], team)
+        self.assertNotIn(self.players[1], team)
+        team[0] = Player("Other", 0)
+        self.assertIn(Player("Other", 0), team)
+        self.assertNotIn(self.players[2], team)
+        del team[:]
+        self.assertEqual(team.mask, 0)
+
+    def test_HandlesAreReadOnly(self):
+        with self.assertRaises(AttributeError):
+            self.players[0].name = "Other"
+
+
 class TestGamePreparation(unittest.TestCase):
 
     def setUp(self):
@@ -174,6 +238,98 @@ class TestAnnouncements(unittest.TestCase):
         self.assertEquals(self.game.state.phase, State.PHASE_SELECTION)
         self.assertEquals(self.game.state.leader, self.game.state.players[1])
 
+    def test_TrustedAnnouncementIsNotCopied(self):
+        p = self.game.state.players
+        ann = {p[1]: 1.0}
+        self.game.validate = False
+        self.game.replay.append(('announcements', [(p[0], ann)]))
+        self.game.step()
+        self.assertIs(self.game.calls['onAnnouncement'][1], ann)
+
+
+class TestRules(unittest.TestCase):
+
+    def test_Roles(self):
+        self.assertEqual(Rules.get(5).roles, sorted(set(itertools.permutations([True, True, False, False, False]))))
+        self.assertEqual(len(Rules.get(10).roles), 210)
+        self.assertEqual([Rules.get(n).spies for n in range(5, 11)], [2, 2, 3, 3, 3, 4])
+        self.assertIs(Rules.get(8), Rules.get(8))
+        self.assertRaises(ValueError, Rules, 4)
+
+
+class TestModel(unittest.TestCase):
+
+    def setUp(self):
+        self.game = FakeGame()
+        self.game.step()
+
+    def play(self, model, action):
+        """Play the same action in the game, up to the next decision."""
+        s = self.game.state
+        if s.phase == State.PHASE_SELECTION:
+            self.game.replay.append(('selection', [p for p in s.players if action >> p.index & 1]))
+        elif s.phase == State.PHASE_VOTING:
+            self.game.replay.append(('votes', [bool(action >> i & 1) for i in range(5)]))
+        else:
+            self.game.replay.append(('sabotages', action))
+        self.game.step()
+        if s.phase == State.PHASE_ANNOUNCING and not self.game.done:
+            self.game.replay.append(('announcements', []))
+            self.game.step()
+        model.apply(action)
+
+    def test_ActionsMatchRules(self):
+        model = self.game.fork()
+        self.assertEqual(len(model.actions()), 10)
+        self.assertTrue(all([bin(a).count('1') == 2 for a in model.actions()]))
+        model.apply(0b00011)
+        self.assertEqual(len(model.actions()), 32)
+        model.apply(0b00111)
+        self.assertEqual(model.actions(), (0, 1, 2))
+
+    def test_MatchesGame(self):
+        random.seed(0)
+        for _ in range(20):
+            self.setUp()
+            model = self.game.fork()
+            while not self.game.done:
+                self.play(model, random.choice(model.actions()))
+                self.assertEqual(model.state, self.game.state)
+            self.assertTrue(model.done)
+            self.assertEqual(model.won, self.game.won)
+
+    def test_LargerTables(self):
+        state = State()
+        state.players = [Player("Mock", i) for i in range(7)]
+        state.leader = state.players[0]
+        state.phase = State.PHASE_SELECTION
+        state.turn = 4
+        model = state.fork()
+        self.assertEqual(len(model.actions()), 35)
+        model.apply(0b0001111)
+        self.assertEqual(len(model.actions()), 128)
+        model.apply(0b0000111)
+        self.assertEqual((model.state.phase, model.state.tries), (State.PHASE_SELECTION, 2))
+        model.apply(0b0001111)
+        model.apply(0b1111000)
+        model.apply(1)
+        # The fourth mission only fails with two sabotages with 7 players.
+        self.assertEqual((model.state.wins, model.state.losses), (1, 0))
+
+    def test_UndoAndFork(self):
+        model = self.game.fork()
+        start = model.state.clone()
+        other = model.fork()
+        for action in (0b00011, 0b00000, 0b01100, 0b11111, 1):
+            model.apply(action)
+        self.assertEqual((model.state.tries, model.state.losses), (1, 1))
+        self.assertEqual(other.state, start)
+        self.assertEqual(self.game.state, start)
+        for _ in range(5):
+            model.undo()
+        self.assertEqual(model.state, start)
+        self.assertIsNone(model.state.team)
+
 
 if __name__ == "__main__":
     unittest.main()
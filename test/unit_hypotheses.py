@@ -0,0 +1,51 @@
+import itertools
+import unittest
+
+from player import Player
+from hypotheses import Hypotheses, Table, members, mask
+
+
+class TestHypotheses(unittest.TestCase):
+
+    def setUp(self):
+        self.players = [Player('P%i' % i, i) for i in range(5)]
+
+    def brute(self, configs, team, check):
+        return set([c for c in configs if check(len(members(team, c)))])
+
+    def test_Configurations(self):
+        assert len(Table.get(5).configurations) == 10
+        assert len(Hypotheses()) == 10
+        for index in range(5):
+            h = Hypotheses.excluding(index)
+            assert len(h) == 6
+            assert all([not c >> index & 1 for c in h])
+
+    def test_LargerTables(self):
+        assert len(Hypotheses(players = 10)) == 210
+        assert len(Hypotheses.excluding(3, 7)) == 20
+        assert all([bin(c).count('1') == 3 for c in Hypotheses(players = 7)])
+
+    def test_Filters(self):
+        for players in (5, 7):
+            table = [Player('P%i' % i, i) for i in range(players)]
+            for team in itertools.combinations(table, 3):
+                h = Hypotheses.excluding(0, players)
+                for n in range(5):
+                    assert set(h.sabotaged(team, n)) == self.brute(h, team, lambda k: k >= n)
+                    assert set(h.exactly(mask(team), n)) == self.brute(h, team, lambda k: k == n)
+                assert set(h.clean(team)) == self.brute(h, team, lambda k: k == 0)
+
+    def test_Sequence(self):
+        h = Hypotheses.excluding(0)
+        h = h.sabotaged(self.players[1:3], 1)
+        assert len(h) == 5
+        h = h.sabotaged(self.players[2:4], 2)
+        assert list(h) == [0b01100]
+        assert members(self.players, h.choice()) == self.players[2:4]
+        assert not h.clean(self.players[3:5])
+        assert h == Hypotheses(h.bits)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+
+import journal
+from journal import Journal
+
+
+def write(filename, count):
+    journal = Journal(filename)
+    for i in range(count):
+        journal.add('shared', 1)
+        journal.add(('own', os.getpid()), 1)
+        journal.flush()
+
+
+def initialize(filename, imported):
+    def increments():
+        # Slow enough for the other processes to check the file meanwhile.
+        time.sleep(0.2)
+        yield 'imported', 1.0, 1
+    imported.put(Journal(filename).initialize(increments))
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'counters.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def totals(self, increments, totals = None):
+        totals = {} if totals is None else totals
+        for key, total, samples in increments:
+            c = totals.setdefault(key, [0.0, 0])
+            c[0] += total
+            c[1] += samples
+        return totals
+
+    def test_ReadsOnlyOtherWriters(self):
+        first, second = Journal(self.filename), Journal(self.filename)
+        first.add('a', 1.0)
+        first.add('a', 0.0)
+        first.flush()
+        self.assertEqual(first.read(), (True, [('a', 1.0, 2)]))
+        self.assertEqual(first.read(), (False, []))
+
+        second.read()
+        second.add('b', 1.0)
+        second.flush()
+        self.assertEqual(second.read(), (False, []))
+        self.assertEqual(first.read(), (False, [('b', 1.0, 1)]))
+
+    def test_ConcurrentWriters(self):
+        processes = [multiprocessing.Process(target = write, args = (self.filename, 200)) for _ in range(4)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+
+        replaced, increments = Journal(self.filename).read()
+        totals = self.totals(increments)
+        self.assertEqual(totals['shared'], [800.0, 800])
+        self.assertEqual(len(totals), 5)
+
+    def test_UnfinishedFrameIsSkipped(self):
+        journal = Journal(self.filename)
+        journal.add('a', 1.0)
+        journal.flush()
+        with open(self.filename, 'ab') as f:
+            f.write(journal.frame(b'x' * 100)[:50])
+        self.assertEqual(Journal(self.filename).read(), (True, [('a', 1.0, 1)]))
+
+        journal.add('a', 1.0)
+        journal.flush()
+        self.assertEqual(self.totals(Journal(self.filename).read()[1]), {'a': [2.0, 2]})
+
+    def test_ShortWritesAreCompleted(self):
+        write = os.write
+        journal.os.write = lambda fd, data: write(fd, data[:7])
+        try:
+            writer = Journal(self.filename)
+            for i in range(100):
+                writer.add(('key', i), 1.0)
+            writer.flush()
+        finally:
+            journal.os.write = write
+        self.assertEqual(len(Journal(self.filename).read()[1]), 100)
+
+    def test_ImportedOnlyOnce(self):
+        imported = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target = initialize, args = (self.filename, imported)) for _ in range(3)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+
+        self.assertEqual(sorted([imported.get() for _ in processes]), [False, False, True])
+        self.assertEqual(self.totals(Journal(self.filename).read()[1]), {'imported': [1.0, 1]})
+
+    def test_CompactionKeepsTotals(self):
+        writer, reader = Journal(self.filename), Journal(self.filename)
+        for i in range(10):
+            writer.add('a', i % 2)
+            writer.flush()
+        totals = self.totals(reader.read()[1])
+        self.assertEqual(reader.frames, 10)
+
+        writer.compact()
+        writer.add('b', 1.0)
+        replaced, increments = reader.read()
+        self.assertTrue(replaced)
+        self.assertEqual(self.totals(increments), totals)
+        self.assertEqual(reader.frames, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import shutil
+import logging
+import tempfile
+import unittest
+
+import logger
+
+
+class TestWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_RecordsWrittenPerBot(self):
+        writer = logger.Writer(self.directory)
+        for i in range(3):
+            writer.put(logging.makeLogRecord({'name': 'A', 'msg': 'Vote %i.', 'args': (i,)}))
+        writer.put(logging.makeLogRecord({'name': 'B', 'msg': 'Select.'}))
+        writer.close()
+
+        with open(os.path.join(self.directory, 'A.log')) as f:
+            self.assertEqual(f.read(), 'Vote 0.\nVote 1.\nVote 2.\n')
+        with open(os.path.join(self.directory, 'B.log')) as f:
+            self.assertEqual(f.read(), 'Select.\n')
+
+
+class TestLevel(unittest.TestCase):
+
+    def tearDown(self):
+        logger.configure(logging.DEBUG)
+
+    def test_SilentDropsRecordsBeforeFormatting(self):
+        class Message(object):
+            def __str__(self):
+                raise AssertionError("Formatted a dropped record.")
+
+        log = logger.getLogger('TestLevel')
+        logger.configure('SILENT')
+        self.assertFalse(log.isEnabledFor(logging.CRITICAL))
+        log.debug(Message())
+        log.critical(Message())
+
+        logger.configure('INFO')
+        self.assertTrue(log.isEnabledFor(logging.INFO))
+        self.assertFalse(log.isEnabledFor(logging.DEBUG))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import math
+import shutil
+import tempfile
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if os.path.join(ROOT, 'tools') not in sys.path:
+    sys.path.append(os.path.join(ROOT, 'tools'))
+
+from record import GameRecord, RecordWriter
+
+
+def game(seed, players, spies, win, attempts):
+    r = GameRecord(seed, players, spies)
+    r.attempts = attempts
+    r.win = win
+    return r
+
+
+# The resistance wins the first game, and the spies the second.
+GAMES = [game(1, ['A', 'B', 'C', 'D', 'E'], 0b00011, True,
+              [(1, 1, 0, 0b00110, 0b00001, -1), (1, 2, 1, 0b01100, 0b11111, 0)]),
+         game(2, ['B', 'A', 'C', 'D', 'E'], 0b01100, False,
+              [(1, 1, 0, 0b01100, 0b11111, 1)])]
+
+
+@unittest.skipIf(numpy is None, "Queries require numpy.")
+class TestQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, 'logs'))
+        self.filename = os.path.join(self.directory, 'logs', 'games.rec')
+        with RecordWriter(self.filename) as writer:
+            for g in GAMES:
+                writer.write(g)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def load(self):
+        from query import Games
+        return Games.load(self.filename)
+
+    def test_Columns(self):
+        games = self.load()
+        self.assertEqual(list(games.names), ['A', 'B', 'C', 'D', 'E'])
+        self.assertEqual(games.seed.tolist(), [1, 2])
+        self.assertEqual(games.win.tolist(), [1, 0])
+        self.assertEqual(games.player.tolist(), [[0, 1, 2, 3, 4], [1, 0, 2, 3, 4]])
+        self.assertEqual(games.spy.tolist(), [[True, True, False, False, False], [False, False, True, True, False]])
+        self.assertEqual(games.game.tolist(), [0, 0, 1])
+        self.assertEqual(games.sabotages.tolist(), [-1, 0, 1])
+
+    def test_Aggregates(self):
+        games = self.load()
+        bots = dict((name, (res, spy)) for name, res, spy in games.bots())
+        self.assertEqual(bots['A'], ((0.0, 1), (0.0, 1)))
+        self.assertEqual(bots['C'], ((1.0, 1), (1.0, 1)))
+        self.assertEqual(bots['E'][0], (0.5, 2))
+        self.assertEqual(bots['E'][1][1], 0)
+
+        turn, attempts, approved, sabotaged = games.missions()[0]
+        self.assertEqual((turn, attempts, sabotaged), (1, 3, 0.5))
+        self.assertAlmostEqual(approved, 2.0 / 3.0)
+
+        self.assertEqual(games.selected.tolist(), [[0, 1, 2, 1, 0], [0, 0, 1, 1, 0]])
+        self.assertEqual(games.selfSelected.tolist(), [[0, 0, 0, 0, 0], [0, 0, 0, 0, 0]])
+        self.assertEqual(games.votedOwn.tolist(), [[1, 1, 0, 0, 0], [1, 0, 0, 0, 0]])
+        self.assertAlmostEqual(games.correlation(games.selected, games.won, ~games.spy), math.sqrt(3.0 / 7.0))
+
+    def test_CacheRebuiltWhenRecordsGrow(self):
+        self.assertEqual(len(self.load()), 2)
+        self.assertTrue(os.path.exists(self.filename + '.npz'))
+        self.assertEqual(len(self.load()), 2)
+
+        with RecordWriter(self.filename) as writer:
+            writer.write(game(3, ['E', 'D', 'C', 'B', 'A'], 0b10001, None, []))
+        # Even if the cache looks more recent, e.g. within the same tick.
+        t = os.path.getmtime(self.filename) + 10.0
+        os.utime(self.filename + '.npz', (t, t))
+
+        games = self.load()
+        self.assertEqual(len(games), 3)
+        self.assertEqual(games.win.tolist(), [1, 0, -1])
+        self.assertEqual(len(self.load()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
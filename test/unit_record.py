@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import record
+from record import GameRecord, Encoder, RecordWriter
+from competition import play
+from bots.intermediates import Simpleton, Bounder
+
+
+class TestRecord(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'games.rec')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_EncodeDecodeGame(self):
+        r = GameRecord(42, ['A', 'B', 'A', 'C', 'B'], spies = 0b00110)
+        r.attempts = [(1, 1, 0, 0b00011, 0b11100, -1), (1, 2, 1, 0b00110, 0b11111, 1)]
+        r.announcements = [(1, 3, {1: 0.5, 2: 1.0})]
+        r.win = False
+
+        data = r.encode(['A', 'B', 'C'].index)
+        self.assertEqual(GameRecord.decode(data, ['A', 'B', 'C']), r)
+
+    def test_SegmentsAppendedToFile(self):
+        players = (Simpleton, Bounder, Simpleton, Bounder, Simpleton)
+        roles = (True, False, False, True, False)
+
+        encoder = Encoder()
+        for seed in range(3):
+            play((players, roles, True, seed), records = encoder)
+        with RecordWriter(self.filename, capacity = 1) as writer:
+            writer.append(encoder.take())
+            play((players[::-1], roles, True, 3), records = writer)
+
+        games = list(record.read(self.filename))
+        self.assertEqual([g.seed for g in games], [0, 1, 2, 3])
+        self.assertEqual(games[0].players, ['Simpleton', 'Bounder', 'Simpleton', 'Bounder', 'Simpleton'])
+        self.assertEqual(games[0].spies, 0b01001)
+        self.assertEqual(games[3].spies, 0b01001)
+
+        for g in games:
+            self.assertTrue(g.win is not None)
+            missions = [a for a in g.attempts if a[5] >= 0]
+            self.assertEqual(len([m for m in missions if m[5] == 0]) >= 3, g.win)
+            for turn, tries, leader, team, votes, sabotages in g.attempts:
+                self.assertEqual(bin(votes).count('1') > 2, sabotages >= 0)
+
+    def test_SameGameSameRecord(self):
+        players = (Simpleton, Bounder, Simpleton, Bounder, Simpleton)
+        roles = (True, False, False, True, False)
+        with RecordWriter(self.filename) as writer:
+            for _ in range(2):
+                play((players, roles, True, 7), records = writer)
+        first, second = record.read(self.filename)
+        self.assertEqual(first, second)
+
+
+    def test_LongNamesRejected(self):
+        encoder = Encoder()
+        self.assertEqual(encoder.name(u'\u00e9' * 127), 0)
+        self.assertRaises(ValueError, encoder.name, 'X' * 256)
+
+    def test_TruncatedTailIgnored(self):
+        players = (Simpleton, Bounder, Simpleton, Bounder, Simpleton)
+        roles = (True, False, False, True, False)
+        with RecordWriter(self.filename) as writer:
+            for seed in range(2):
+                play((players, roles, True, seed), records = writer)
+        size = os.path.getsize(self.filename)
+        # As if the writer crashed in the middle of the last game, or header.
+        for cut, count in ((1, 1), (10, 1), (size - 10, 0), (size - 7, 0)):
+            with open(self.filename, 'r+b') as f:
+                f.truncate(size - cut)
+            self.assertEqual(len(list(record.read(self.filename))), count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import multiprocessing
+
+import shared
+from competition import CompetitionRunner, WorkerPool
+from bots.intermediates import Simpleton, Bounder
+from bots.learners import Statistician
+
+
+def learn(address, value):
+    shared.connect(address)
+    shared.stores['Test'].sample('key', value)
+    shared.synchronize()
+
+
+class TestStatistics(unittest.TestCase):
+
+    def setUp(self):
+        self.statistics = shared.stores.get('Test') or shared.Statistics('Test')
+        shared.reset()
+
+    def tearDown(self):
+        shared.reset()
+
+    def test_LocalWithoutServer(self):
+        self.assertEqual(self.statistics.estimate('key'), 0.5)
+        self.statistics.sample('key', 1)
+        self.statistics.sample('key', 0)
+        shared.synchronize()
+        self.assertEqual(self.statistics.get('key'), (1.0, 2))
+        self.assertEqual(self.statistics.estimate('key'), 0.5)
+
+    def test_SamplesSharedBetweenProcesses(self):
+        server = shared.Server()
+        try:
+            shared.connect(server.address)
+            self.statistics.sample('key', 1)
+            shared.synchronize()
+
+            p = multiprocessing.Process(target = learn, args = (server.address, 0))
+            p.start()
+            p.join()
+            self.assertEqual(self.statistics.get('key'), (1.0, 1))
+
+            shared.synchronize()
+            self.assertEqual(self.statistics.get('key'), (1.0, 2))
+
+            # The statistics are loaded again after a reset.
+            shared.reset()
+            self.assertEqual(self.statistics.get('key'), (0.0, 0))
+            shared.connect(server.address)
+            shared.synchronize()
+            self.assertEqual(self.statistics.get('key'), (1.0, 2))
+        finally:
+            server.shutdown()
+
+    def test_ServerOverTCP(self):
+        server = shared.Server(('localhost', 0), b'secret')
+        try:
+            self.assertEqual(server.address[1], b'secret')
+            self.assertTrue(server.address[0][1] > 0)
+            p = multiprocessing.Process(target = learn, args = (server.address, 1))
+            p.start()
+            p.join()
+            shared.connect(server.address)
+            shared.synchronize()
+            self.assertEqual(self.statistics.get('key'), (1.0, 1))
+        finally:
+            # Disconnected first, or the proxy retries a closed TCP port.
+            shared.reset()
+            server.shutdown()
+
+    def test_WildcardServerUsesCoordinator(self):
+        server = shared.Server(('0.0.0.0', 0), b'secret')
+        try:
+            shared.coordinator = 'localhost'
+            shared.connect(server.address)
+            self.statistics.sample('key', 1)
+            shared.synchronize()
+            self.assertEqual(self.statistics.get('key'), (1.0, 1))
+        finally:
+            shared.coordinator = None
+            shared.reset()
+            server.shutdown()
+
+    def test_LearnersShareAcrossWorkers(self):
+        server, workers = shared.Server(), WorkerPool([Statistician, Simpleton, Bounder], processes = 2)
+        try:
+            runner = CompetitionRunner([Statistician, Simpleton, Bounder], 20, quiet = True, pool = workers, shared = server)
+            runner.main()
+            shared.connect(server.address)
+            shared.synchronize()
+            votes = Statistician.global_statistics.get(('Simpleton', 'res_VotesForRes'))[1] \
+                  + Statistician.global_statistics.get(('Simpleton', 'spy_VotesForRes'))[1]
+            self.assertTrue(votes > 0)
+        finally:
+            workers.close()
+            workers.join()
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
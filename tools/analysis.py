@@ -1,25 +1,85 @@
 #!/usr/bin/python2.7 -u
+"""Measure the performance of a bot against cheating bots of exact skill, for
+each combination of skill as resistance and spy.
+
+The games for all the skill levels are played once and stored in a file of
+records, with the skill levels in the seeds of the games.  The results are then
+computed from the records for each role, so other questions can be answered
+from the same file with `query.py` without playing the games again."""
+from __future__ import print_function
+
+import os
+import sys
 import itertools
-import multiprocessing
 
-from competition import CompetitionRunner
+from competition import CompetitionRunner, WorkerPool
 
 from bots.cheaters import RandomCheater
 from sceptic import ScepticBot
 
 
-def main(arg):
-    print '.',
-    res, spy = arg
+LEVELS = 11
+
+
+def configure(res, spy):
     RandomCheater.cheat_SetRate(float(res) / 10.0, float(spy) / 10.0)
 
-    # Score of this bot is calculated relative to the scores of all these other bots.
-    competitors = [ScepticBot, RandomCheater, RandomCheater, RandomCheater, RandomCheater]
-    runner = CompetitionRunner(competitors, 250, quiet = True)
-    runner.main()
 
-    # TODO: Split the evaluation depending on whether the bot is Spy or Resistance.
-    return (res, spy), runner.score('ScepticBot')[1] - runner.score('RandomCheater')[1]
+def simulate(filename, games):
+    """Play the games for all the skill levels, appending them to the file.
+    The same workers play all the competitions, with the bots reset each time."""
+    workers = WorkerPool([ScepticBot, RandomCheater])
+    for res, spy in itertools.product(range(LEVELS), range(LEVELS)):
+        print('.', end='')
+        workers.configure(configure, res, spy)
+
+        # Score of this bot is calculated relative to the scores of all these other bots.
+        competitors = [ScepticBot, RandomCheater, RandomCheater, RandomCheater, RandomCheater]
+        runner = CompetitionRunner(competitors, games, quiet = True, seed = res * LEVELS + spy,
+                                   record = filename, pool = workers)
+        runner.main()
+    workers.close()
+    workers.join()
+
+
+def improvement(games, bot, opponent):
+    """Difference between the win rates of the bot and its opponents for each
+    combination of skill levels, as arrays of (LEVELS, LEVELS) for resistance
+    and spy.  The skill levels are read from the seeds of the games."""
+    import numpy
+
+    cells = numpy.broadcast_to((games.seed >> numpy.uint64(32)).astype(int)[:, None], games.spy.shape)
+    won, finished = games.won, numpy.broadcast_to(games.win[:, None] >= 0, games.spy.shape)
+
+    def rate(seats):
+        wins = numpy.bincount(cells[seats], weights = won[seats], minlength = LEVELS * LEVELS)
+        total = numpy.bincount(cells[seats], minlength = LEVELS * LEVELS)
+        return wins / numpy.maximum(total, 1)
+
+    results = []
+    for role in [~games.spy, games.spy]:
+        delta = rate(games.bot(bot) & role & finished) - rate(games.bot(opponent) & role & finished)
+        results.append(delta.reshape(LEVELS, LEVELS))
+    return results
+
+
+def sweep(bot, games):
+    """The same differences as `improvement()` for a stock bot that has a
+    vectorized policy, see batch.py, computed from the statistics of batch
+    competitions for each combination of skill levels, without records."""
+    import numpy
+    from batch import BatchRunner
+
+    results = numpy.zeros((2, LEVELS, LEVELS))
+    for res, spy in itertools.product(range(LEVELS), range(LEVELS)):
+        configure(res, spy)
+        competitors = [bot, RandomCheater, RandomCheater, RandomCheater, RandomCheater]
+        runner = BatchRunner(competitors, games, quiet = True, seed = res * LEVELS + spy)
+        runner.main()
+        stats, other = runner.statistics[bot.__name__], runner.statistics[RandomCheater.__name__]
+        results[0, res, spy] = stats.resWins.estimate() - other.resWins.estimate()
+        results[1, res, spy] = stats.spyWins.estimate() - other.spyWins.estimate()
+    return results
 
 
 if __name__ == '__main__':
@@ -28,31 +88,35 @@ if __name__ == '__main__':
     from matplotlib import cm
     import numpy as np
 
-    fig = plt.figure()
-    ax = fig.add_subplot(111, projection='3d')
-
-    print "Measuring performance of Resistance AI (SkepticBot) against bots of exact skill."
-    print " - 10 total skill levels for spy and resistance."
-    print " - 121 jobs run in total, for 250 games each."
-    print " - Using %i threads to run the evaluations...\n" % multiprocessing.cpu_count()
-
-    pool = multiprocessing.Pool(processes=multiprocessing.cpu_count())
-    results = {}
-    for i, t in pool.map(main, itertools.product(range(11), range(11))):
-        results[i] = float(t)
-
-    X, Y = np.meshgrid(range(11), range(11))
-    zs = np.array([results[(x,y)] for x,y in zip(np.ravel(X), np.ravel(Y))])
-    Z = zs.reshape(X.shape)
+    from query import Games
 
-    ax.plot_surface(X, Y, Z, rstride=1, cstride=1, cmap=cm.jet, linewidth=1, antialiased=True)
+    if len(sys.argv) > 2 and sys.argv[1] == '--batch':
+        from competition import getCompetitors
+        bot = getCompetitors(sys.argv[2:3])[0]
+        print("Measuring performance of %s against bots of exact skill, in batches of 10000 games." % bot.__name__)
+        res, spy = sweep(bot, 10000)
+    else:
+        filename = sys.argv[1] if len(sys.argv) > 1 else 'analysis.rec'
+        if not os.path.exists(filename):
+            print("Measuring performance of Resistance AI (SkepticBot) against bots of exact skill.")
+            print(" - 10 total skill levels for spy and resistance.")
+            print(" - 121 competitions in total, for 250 games each.")
+            print(" - Recording the games in %s for later analysis...\n" % filename)
+            simulate(filename, 250)
 
-    ax.set_xlabel('Resistance Skill')
-    ax.set_xticklabels(['r=%1.1f' % (float(i*2)/10.0) for i in range(6)])
-    ax.set_ylabel('Spy Skill')
-    ax.set_yticklabels(['s=%1.1f' % (float(i*2)/10.0) for i in range(6)])
-    ax.set_zlabel('Improvement')
+        res, spy = improvement(Games.load(filename), 'ScepticBot', 'RandomCheater')
 
-    print "\n\nShowing performance graph of the evaluated bot relative to its opponents."
+    fig = plt.figure()
+    X, Y = np.meshgrid(range(LEVELS), range(LEVELS))
+    for i, (title, Z) in enumerate([('Resistance', res), ('Spy', spy)]):
+        ax = fig.add_subplot(1, 2, i+1, projection='3d')
+        ax.plot_surface(X, Y, Z.T, rstride=1, cstride=1, cmap=cm.jet, linewidth=1, antialiased=True)
+        ax.set_title(title)
+        ax.set_xlabel('Resistance Skill')
+        ax.set_xticklabels(['r=%1.1f' % (float(i*2)/10.0) for i in range(6)])
+        ax.set_ylabel('Spy Skill')
+        ax.set_yticklabels(['s=%1.1f' % (float(i*2)/10.0) for i in range(6)])
+        ax.set_zlabel('Improvement')
+
+    print("\n\nShowing performance graph of the evaluated bot relative to its opponents.")
     plt.show()
-
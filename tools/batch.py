@@ -0,0 +1,280 @@
+"""Competitions between the simple stock bots, played many games at once as
+numpy arrays rather than one game at a time.
+
+Each game is a row of the arrays: the bot and the role in each seat, and the
+turn, attempt, leader, team and score of the game so far.  All the games play
+their next attempt at a mission together, and the decisions of each bot are
+reimplemented as vectorized operations over the rows where it's playing, see
+`POLICIES`.  The results are the same `StatisticsTable` as in a competition,
+so they can be shown and compared in the same way:
+
+    > PYTHONPATH=. python tools/batch.py 100000 bots/beginners.py
+
+The games are statistically the same as those played by the bots themselves,
+but not identical since the random numbers are drawn in a different order.
+"""
+from __future__ import print_function
+
+import sys
+import array
+import itertools
+
+import numpy
+
+from competition import CompetitionRunner, StatisticsTable, getCompetitors,            \
+                        RES_WINS, SPY_WINS, RES_VOTES_RES, RES_VOTES_SPY, SPY_VOTES_RES,  \
+                        SPY_VOTES_SPY, SPY_VOTED, RES_VOTED, SPY_SELECTED, RES_SELECTED,  \
+                        SPY_SELECTION, RES_SELECTION, TIMEOUTS
+from game import BaseGame, Rules
+
+
+class Policy(object):
+    """Vectorized decisions of one bot, for the given rows of the games where
+    it's playing in the given seats.  Each function returns an array with one
+    entry per row, or a bool (rows, seats) array of the team for `select()`."""
+
+    def __init__(self, bot):
+        self.name = bot.__name__
+
+    def select(self, games, rows, seats):
+        """Pick itself and random other players."""
+        return games.sample(rows, games.seat(rows, seats), numpy.ones((len(rows), games.seats), dtype = bool))
+
+    def vote(self, games, rows, seats):
+        return numpy.ones(len(rows), dtype = bool)
+
+    def sabotage(self, games, rows, seats):
+        return numpy.ones(len(rows), dtype = bool)
+
+
+class Paranoid(Policy):
+
+    def vote(self, games, rows, seats):
+        return games.leader[rows] == seats
+
+
+class Hippie(Policy):
+    pass
+
+
+class RandomBot(Policy):
+
+    def select(self, games, rows, seats):
+        everyone = numpy.ones((len(rows), games.seats), dtype = bool)
+        return games.sample(rows, ~everyone, everyone)
+
+    def vote(self, games, rows, seats):
+        return games.random.random_sample(len(rows)) < 0.5
+
+    def sabotage(self, games, rows, seats):
+        return games.random.random_sample(len(rows)) < 0.5
+
+
+class RuleFollower(Policy):
+
+    def vote(self, games, rows, seats):
+        spy = games.spy[rows, seats]
+        team = games.team[rows]
+        spied = (team & games.spy[rows]).any(axis = 1)
+        outsider = (team.sum(axis = 1) == 3) & ~team[numpy.arange(len(rows)), seats]
+        return numpy.where(games.tries[rows] == 5, ~spy, numpy.where(spy, spied, ~outsider))
+
+
+class RandomCheater(Policy):
+    """The rates of correct decisions are read from the module of the bot,
+    where they're set by `RandomCheater.cheat_SetRate()`."""
+
+    def __init__(self, bot):
+        super(RandomCheater, self).__init__(bot)
+        module = sys.modules[bot.__module__]
+        self.rates = numpy.array([getattr(module, 'RES_CHEAT_RATIO', 0.7), getattr(module, 'SPY_CHEAT_RATIO', 0.7)])
+
+    def correct(self, games, rows, seats):
+        rates = self.rates[games.spy[rows, seats].astype(int)]
+        return games.random.random_sample(len(rows)) <= rates
+
+    def select(self, games, rows, seats):
+        # Either one or two spies for the mission if not correct, then the
+        # rest of the team from the resistance.
+        spies = numpy.where(self.correct(games, rows, seats), 0, games.random.randint(1, 3, len(rows)))
+        spy = games.spy[rows]
+        count = games.count[rows]
+        return games.sample(rows, numpy.zeros_like(spy), spy, spies) | games.sample(rows, numpy.zeros_like(spy), ~spy, count - spies)
+
+    def vote(self, games, rows, seats):
+        spied = (games.team[rows] & games.spy[rows]).any(axis = 1)
+        return numpy.where(self.correct(games, rows, seats), ~spied, spied)
+
+
+POLICIES = dict((p.__name__, p) for p in [Paranoid, Hippie, RandomBot, RuleFollower, RandomCheater])
+
+
+class Games(object):
+    """Games played together, one row per game, with these columns:
+
+        player      int (games, seats): Index of the policy in each seat, for
+                    any number of players with the rules for that number.
+        spy         bool (games, seats): Whether each player is a spy.
+        turn, tries, wins, losses, leader
+                    int (games): The same as in `State`, with the leader's seat.
+        team        bool (games, seats): Whether each player is on the team.
+    """
+
+    def __init__(self, player, spy, policies, random):
+        self.player = player
+        self.spy = spy
+        self.policies = policies
+        self.random = random
+        n, self.seats = player.shape
+        self.rules = Rules.get(self.seats)
+        self.turn = numpy.ones(n, dtype = int)
+        self.tries = numpy.ones(n, dtype = int)
+        self.wins = numpy.zeros(n, dtype = int)
+        self.losses = numpy.zeros(n, dtype = int)
+        self.leader = numpy.zeros(n, dtype = int)
+        self.team = numpy.zeros((n, self.seats), dtype = bool)
+        # Counters for each policy in the same layout as the StatisticsTable.
+        self.counters = numpy.zeros((len(policies), StatisticsTable.WIDTH))
+
+    @property
+    def count(self):
+        """int (games): Number of players on the team for the current mission."""
+        return numpy.array(self.rules.participants)[numpy.minimum(self.turn, BaseGame.MAX_TURNS) - 1]
+
+    @property
+    def done(self):
+        return (self.tries > BaseGame.MAX_TRIES) | (self.turn > BaseGame.MAX_TURNS)   \
+             | (self.wins >= BaseGame.NUM_WINS) | (self.losses >= BaseGame.NUM_LOSSES)
+
+    def seat(self, rows, seats):
+        """bool (rows, seats): One-hot encoding of the given seat in each row."""
+        return numpy.arange(self.seats) == seats[:, None]
+
+    def sample(self, rows, forced, candidates, count = None):
+        """bool (rows, seats): Teams of the players forced in each row, then
+        random candidates up to the number of players for the mission."""
+        count = self.count[rows] if count is None else count
+        keys = self.random.random_sample((len(rows), self.seats))
+        keys[~candidates] = 2.0
+        keys[forced] = -1.0
+        return keys.argsort(axis = 1).argsort(axis = 1) < count[:, None]
+
+    def decide(self, function, rows, seats):
+        """Call the function of the policy in the seat of each row."""
+        result = None
+        player = self.player[rows, seats]
+        for i, policy in enumerate(self.policies):
+            where = numpy.nonzero(player == i)[0]
+            if len(where) == 0:
+                continue
+            r = getattr(policy, function)(self, rows[where], seats[where])
+            if result is None:
+                result = numpy.zeros((len(rows),) + r.shape[1:], dtype = bool)
+            result[where] = r
+        return result
+
+    def sample_counters(self, player, column, values, samples = 1.0):
+        """Add values to the counters, for arrays of players and columns."""
+        player, column, values, samples = numpy.broadcast_arrays(player, column, values, samples)
+        index = (player * StatisticsTable.WIDTH + column).ravel()
+        counters = self.counters.reshape(-1)
+        counters += numpy.bincount(index, weights = values.ravel().astype(float), minlength = counters.size)
+        counters += numpy.bincount(index + 1, weights = samples.ravel().astype(float), minlength = counters.size)
+
+    def step(self, rows):
+        """Play the next attempt at a mission in each of the given games."""
+        player, spy = self.player[rows], self.spy[rows]
+        leader = self.leader[rows]
+
+        self.team[rows] = team = self.decide('select', rows, leader)
+        spied = (team & spy).any(axis = 1)
+        leading = spy[numpy.arange(len(rows)), leader]
+        self.sample_counters(player[numpy.arange(len(rows)), leader], numpy.where(leading, SPY_SELECTION, RES_SELECTION),
+                             numpy.where(leading, spied, ~spied))
+        self.sample_counters(player, numpy.where(spy, SPY_SELECTED, RES_SELECTED), team)
+
+        votes = numpy.zeros((len(rows), self.seats), dtype = bool)
+        for s in range(self.seats):
+            votes[:, s] = self.decide('vote', rows, numpy.full(len(rows), s))
+        # Whether the votes were correct, for spies and resistance.
+        self.sample_counters(player, numpy.where(spy, numpy.where(spied, SPY_VOTES_RES, SPY_VOTES_SPY)[:, None],
+                                                 numpy.where(spied, RES_VOTES_SPY, RES_VOTES_RES)[:, None]),
+                             numpy.where(spied[:, None] != spy, ~votes, votes))
+        # Every member of the team is voted for or against by the resistance.
+        support = (votes & ~spy).sum(axis = 1)[:, None]
+        self.sample_counters(player, numpy.where(spy, SPY_VOTED, RES_VOTED), team * support, team * (~spy).sum(axis = 1)[:, None])
+
+        approved = votes.sum(axis = 1) >= self.rules.majority
+        sabotaged = numpy.zeros(len(rows), dtype = int)
+        mission = numpy.nonzero(approved)[0]
+        for s in range(self.seats):
+            saboteurs = mission[team[mission, s] & spy[mission, s]]
+            if len(saboteurs):
+                sabotaged[saboteurs] += self.decide('sabotage', rows[saboteurs], numpy.full(len(saboteurs), s))
+
+        failed = sabotaged >= numpy.array(self.rules.fails)[self.turn[rows] - 1]
+        self.wins[rows] += approved & ~failed
+        self.losses[rows] += approved & failed
+        self.turn[rows] += approved
+        self.tries[rows] = numpy.where(approved, 1, self.tries[rows] + 1)
+        self.leader[rows] = (leader + 1) % self.seats
+
+    def run(self):
+        """Play all the games until the end, and return their statistics."""
+        while True:
+            rows = numpy.nonzero(~self.done)[0]
+            if len(rows) == 0:
+                break
+            self.step(rows)
+
+        win = self.wins >= BaseGame.NUM_WINS
+        self.sample_counters(self.player, numpy.where(self.spy, SPY_WINS, RES_WINS), win[:, None] != self.spy)
+        self.sample_counters(self.player, TIMEOUTS, 0)
+
+        table = StatisticsTable([p.name for p in self.policies])
+        table.counters = array.array('d', self.counters.ravel().tolist())
+        return table
+
+
+class BatchRunner(CompetitionRunner):
+    """Competition between stock bots that have a vectorized policy, which
+    plays the same lineups and roles as `CompetitionRunner` in chunks of games
+    in this process.  The options to profile, record or share statistics don't
+    apply, and with `adaptive` the games are all played anyway."""
+
+    CHUNK = 50000
+
+    def main(self):
+        names = []
+        for bot in self.competitors:
+            if bot.__name__ not in names:
+                names.append(bot.__name__)
+        policies = []
+        for name in names:
+            bot = [c for c in self.competitors if c.__name__ == name][0]
+            if name not in POLICIES:
+                raise ValueError("There's no vectorized policy for %s, see batch.POLICIES." % name)
+            policies.append(POLICIES[name](bot))
+
+        if not self.quiet:
+            print("Running batch competition with %i bots (seed %i)." % (len(names), self.seed), file=sys.stderr)
+
+        random = numpy.random.RandomState(self.seed & 0xffffffff)
+        selections = self.listGameSelections()
+        while True:
+            chunk = list(itertools.islice(selections, self.CHUNK))
+            if not chunk:
+                break
+            player = numpy.array([[names.index(p.__name__) for p in players] for players, _ in chunk])
+            spy = numpy.array([roles for _, roles in chunk], dtype = bool)
+            self.statistics += Games(player, spy, policies, random).run()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) <= 2:
+        print('USAGE: batch.py 100000 (filename|module.BotName) [...]')
+        sys.exit(-1)
+
+    runner = BatchRunner(getCompetitors(sys.argv[2:]), int(sys.argv[1]))
+    runner.main()
+    runner.show()
@@ -0,0 +1,67 @@
+from __future__ import print_function
+
+import sys
+import time
+import random
+
+from competition import CompetitionRunner, getCompetitors, play
+from game import Rules
+from hypotheses import Table
+
+
+def measure(selections, validate):
+    """Play all the specified games in this process, and return the number
+    of games per second."""
+    t = time.time()
+    for players, roles in selections:
+        play((players, roles, validate, None))
+    return float(len(selections)) / (time.time() - t)
+
+
+def validation(competitors, games):
+    """Compare the speed of games where the data returned by bots is checked,
+    to the speed of trusted games that skip the checks and copies."""
+    random.seed(0)
+    selections = list(CompetitionRunner(competitors, games, quiet = True, seed = 0).listGameSelections())
+
+    print("Playing %i games with %i bots in a single process." % (games, len(set(competitors))))
+    measure(selections[:games // 10], True)
+
+    validated = measure(selections, True)
+    print("  validated %8.1f games/sec" % validated)
+    trusted = measure(selections, False)
+    print("  trusted   %8.1f games/sec (%+.1f%%)" % (trusted, 100.0 * (trusted - validated) / validated))
+
+
+def scaling(competitors, games):
+    """Measure the time to build the tables of rules and spy hypotheses for
+    each number of players, which is only done once, and the speed of trusted
+    games with that many players."""
+    print("Playing %i games with %i bots for each number of players." % (games, len(set(competitors))))
+    print("  players    rules (ms)   hypotheses (ms)   games/sec")
+    for players in sorted(Rules.TEAMS):
+        t = time.time()
+        Rules(players)
+        rules = time.time() - t
+        t = time.time()
+        Table(players)
+        hypotheses = time.time() - t
+
+        random.seed(0)
+        runner = CompetitionRunner(list(competitors), games, quiet = True, seed = 0, players = players)
+        selections = list(runner.listGameSelections())
+        speed = measure(selections, False)
+        print("  %7i %13.1f %17.1f %11.1f" % (players, 1000.0 * rules, 1000.0 * hypotheses, speed))
+
+
+if __name__ == '__main__':
+    scale = '--scaling' in sys.argv
+    argv = [a for a in sys.argv if a != '--scaling']
+    if len(argv) <= 2:
+        print('USAGE: benchmark.py [--scaling] 10000 (filename|module.BotName) [...]')
+        sys.exit(-1)
+
+    if scale:
+        scaling(getCompetitors(argv[2:]), int(argv[1]))
+    else:
+        validation(getCompetitors(argv[2:]), int(argv[1]))
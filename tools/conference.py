@@ -1,7 +1,68 @@
+from __future__ import print_function
+
 import sys
 from time import time
 import itertools
-from competition import CompetitionRunner, getCompetitors
+from competition import CompetitionRunner, StatisticsTable, WorkerPool, getCompetitors
+
+
+class EliminationRunner(CompetitionRunner):
+    """Competition that stops as soon as it's clear which bot is last, playing
+    only the bots that could still be last in the meantime."""
+
+    def unsettled(self):
+        results = sorted([(s.total(), name) for name, s in self.statistics.items()],
+                         key = lambda x: x[0].value())
+        if len(results) < len(set(self.competitors)) or results[0][0].samples < self.ADAPTIVE_GAMES:
+            return super(EliminationRunner, self).unsettled()
+
+        last = results[0][0]
+        close = set([name for v, name in results[1:] if v.value() - v.error() <= last.value() + last.error()])
+        return close | set([results[0][1]]) if close else set()
+
+
+class Tournament(object):
+    """Elimination tournament that keeps the results of all the games for each
+    lineup of bots, so the games without the eliminated bots still count in
+    the next rounds, which only play as many new games as needed.  The same
+    workers play all the rounds, with the bots reset for each one."""
+
+    def __init__(self, pool, rounds):
+        self.pool = pool
+        self.rounds = rounds
+        self.lineups = {}
+        self.workers = WorkerPool(pool)
+
+    def games(self):
+        """Number of games played so far, in all rounds."""
+        return sum([self.count(key, t) for key, t in self.lineups.items()])
+
+    def count(self, key, table):
+        """Number of games played with this lineup, given its key."""
+        return sum([s.total().samples for _, s in table.items()]) / float(len(key))
+
+    def statistics(self):
+        """Results of the games between the bots that are left.  The lineups
+        are reweighted so each counts as much as the average, since games were
+        played more often with the bots that were close to elimination.  The
+        number of samples is still that of the games played, for the intervals
+        of the adaptive runners."""
+        names = set([c.__name__ for c in self.pool])
+        lineups = [(key, t) for key, t in self.lineups.items() if names.issuperset(key)]
+        return StatisticsTable.weighted([t for _, t in lineups], [1.0 / self.count(key, t) for key, t in lineups])
+
+    def round(self, final = False):
+        """Play the next round until the results are clear, starting from the
+        results of the previous games."""
+        if final:
+            runner = CompetitionRunner(self.pool, rounds = int(self.rounds * 2.5), quiet = False,
+                                       adaptive = True, lineups = self.lineups, pool = self.workers)
+        else:
+            runner = EliminationRunner(self.pool, rounds = self.rounds, quiet = True,
+                                       adaptive = True, lineups = self.lineups, pool = self.workers)
+        runner.statistics = self.statistics()
+        runner.main()
+        return runner
 
 
 if __name__ == '__main__':
@@ -12,29 +73,30 @@ if __name__ == '__main__':
     competitors = getCompetitors(sys.argv[2:])
     opponents = getCompetitors([# 'bots.RandomBot', 'bots.RuleFollower', 'bots.Deceiver', 'bots.Jammer', 'bots.Hippie', 'bots.Neighbor',
                                 'aigd.Statistician', 'aigd.LogicalBot'])
-    
+
     pool = competitors + opponents
+    tournament = Tournament(pool, int(sys.argv[1]))
     rnd = 1
     while len(pool) >= 5:
-        r = int(sys.argv[1])
-        if len(pool) == 5:
-            runner = CompetitionRunner(pool, rounds = int(r * 2.5), quiet = False)
-        else:
-            runner = CompetitionRunner(pool, rounds = r, quiet = True)
-        runner.main()
-    
+        # Each round is played until the results are clear, up to a maximum.
+        played = tournament.games()
+        runner = tournament.round(final = len(pool) == 5)
+        print("ROUND #%i: Played %i new games." % (rnd, tournament.games() - played))
+
         if len(pool) == 5:
             runner.show(summary=True)
             break
         else:
             last, other = runner.last()
-            print "ROUND #%i: Eliminated %s." % (rnd, last[0].__name__),
+            print("ROUND #%i: Eliminated %s." % (rnd, last[0].__name__), end=' ')
             if last[1].estimate() + last[1].error() < other[1].estimate()     \
             and other[1].estimate() + other[1].error() > last[1].estimate():
-                print "(approved)"
+                print("(approved)")
             else:
-                print "(suspect %s)" % (other[0].__name__)
-            print " %s vs %s" % (last[1].detail(), other[1].detail())
+                print("(suspect %s)" % (other[0].__name__))
+            print(" %s vs %s" % (last[1].detail(), other[1].detail()))
             pool.remove(last[0])
         rnd += 1
 
+    tournament.workers.close()
+    tournament.workers.join()
@@ -0,0 +1,201 @@
+"""Columnar queries over files of game records, see record.py.
+
+All the games are loaded once into numpy arrays, with one row per game, one
+column per seat for the data about each player, and one row per attempt at a
+mission.  Aggregates per bot, per role and per mission are then computed with
+vectorized operations rather than by simulating the games again.  The columns
+are cached next to the records in a `.npz` file, which is built again once
+more games are appended to the records.
+"""
+from __future__ import print_function
+
+import os
+import sys
+import array
+
+import numpy
+
+import record
+
+
+class Games(object):
+    """Table of recorded games, with these columns:
+
+        names           list[str]: Names of the bots, indexed by the ids below.
+        seed            uint64 (games): Seed of each game, or `record.NO_SEED`.
+        win             int8 (games): 1 if the resistance won, 0 if the spies won,
+                        or -1 if the game was aborted.
+        player          int32 (games, seats): Id of the bot in each seat, or -1
+                        for the seats missing in games with fewer players.
+        spy             bool (games, seats): Whether each player was a spy.
+        game, turn, tries, leader, team, votes, sabotages
+                        (attempts): For each attempt at a mission, the index of
+                        its game and the data as in `GameRecord.attempts`.
+    """
+
+    COLUMNS = ['seed', 'win', 'player', 'spy', 'game', 'turn', 'tries', 'leader',
+               'team', 'votes', 'sabotages']
+
+    def __init__(self, games = (), **columns):
+        if columns:
+            self.names = list(columns.pop('names'))
+            for k in self.COLUMNS:
+                setattr(self, k, columns[k])
+            return
+
+        ids = {}
+        seed, win, players, spies = [], array.array('b'), [], array.array('i')
+        attempts = [array.array('i') for _ in range(7)]
+        for g in games:
+            seed.append(g.seed if g.seed is not None else record.NO_SEED)
+            win.append(-1 if g.win is None else int(g.win))
+            spies.append(g.spies)
+            players.append([ids.setdefault(name, len(ids)) for name in g.players])
+
+            n = len(seed) - 1
+            for a in g.attempts:
+                attempts[0].append(n)
+                for column, value in zip(attempts[1:], a):
+                    column.append(value)
+
+        self.names = sorted(ids, key = ids.get)
+        self.seed = numpy.array(seed, dtype = numpy.uint64)
+        self.win = numpy.array(win, dtype = numpy.int8)
+        self.player = numpy.full((len(players), max([len(p) for p in players] or [5])), -1, dtype = numpy.int32)
+        for i, p in enumerate(players):
+            self.player[i, :len(p)] = p
+        seats = numpy.arange(self.player.shape[1])
+        self.spy = (numpy.array(spies, dtype = numpy.int32)[:, None] >> seats) & 1 == 1
+        for k, column in zip(['game', 'turn', 'tries', 'leader', 'team', 'votes', 'sabotages'], attempts):
+            setattr(self, k, numpy.array(column, dtype = numpy.int32))
+
+    @classmethod
+    def load(cls, filename):
+        """Load the games from a file of records, or the cached columns if they
+        were built from the file as it is now, i.e. the cache is more recent
+        and the file is still the same size, since records are appended."""
+        cache = filename + '.npz'
+        size = os.path.getsize(filename)
+        if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(filename):
+            data = numpy.load(cache)
+            if 'size' in data.files and int(data['size']) == size:
+                return cls(**dict((k, data[k]) for k in data.files if k != 'size'))
+
+        games = cls(record.read(filename))
+        columns = dict((k, getattr(games, k)) for k in cls.COLUMNS)
+        with open(cache, 'wb') as f:
+            numpy.savez(f, names = numpy.array(games.names, dtype = 'U'), size = size, **columns)
+        return games
+
+    def __len__(self):
+        return len(self.win)
+
+    @property
+    def won(self):
+        """bool (games, seats): Whether each player won its game."""
+        return (self.win[:, None] == 1) != self.spy
+
+    @property
+    def approved(self):
+        """bool (attempts): Whether each team was voted up."""
+        return self.sabotages >= 0
+
+    def bot(self, name):
+        """bool (games, seats): Seats where this bot was playing."""
+        return self.player == self.names.index(name)
+
+    def seats(self, values):
+        """Sum a value for each attempt into a column per seat, given a function
+        that returns the value for one seat, e.g. whether it's on the team."""
+        output = numpy.zeros(self.player.shape)
+        for s in range(self.player.shape[1]):
+            output[:, s] = numpy.bincount(self.game, weights = values(s), minlength = len(self))
+        return output
+
+    def member(self, mask, s):
+        return (mask >> s) & 1
+
+    @property
+    def selected(self):
+        """(games, seats): Number of teams that each player was picked for."""
+        return self.seats(lambda s: self.member(self.team, s))
+
+    @property
+    def votedUp(self):
+        """(games, seats): Number of approved teams that each player was on."""
+        return self.seats(lambda s: self.member(self.team, s) * self.approved)
+
+    @property
+    def selfSelected(self):
+        """(games, seats): Number of teams where the leader picked itself."""
+        return self.seats(lambda s: (self.leader == s) * self.member(self.team, s))
+
+    @property
+    def votedOwn(self):
+        """(games, seats): Number of teams where the leader voted for its own team."""
+        return self.seats(lambda s: (self.leader == s) * self.member(self.votes, s))
+
+    def rate(self, values, where = None):
+        """Mean and number of samples of the values for the selected entries."""
+        finished = (self.win[:, None] >= 0) & (self.player >= 0)
+        where = finished if where is None else where & finished
+        n = int(where.sum())
+        return (float(values[where].mean()) if n else float('nan')), n
+
+    def correlation(self, x, y, where = None):
+        """Pearson correlation between two columns, for the selected entries."""
+        finished = (self.win[:, None] >= 0) & (self.player >= 0)
+        where = finished if where is None else where & finished
+        x, y = x[where].astype(float), y[where].astype(float)
+        if len(x) < 2 or x.std() == 0 or y.std() == 0:
+            return float('nan')
+        return float(numpy.corrcoef(x, y)[0, 1])
+
+    def bots(self):
+        """Win rate as resistance and spy for each bot."""
+        won, results = self.won, []
+        for name in self.names:
+            seats = self.bot(name)
+            results.append((name, self.rate(won, seats & ~self.spy), self.rate(won, seats & self.spy)))
+        return results
+
+    def missions(self):
+        """For each mission, the number of attempts, the rate of approval of
+        the teams, and the rate of sabotage of the approved teams."""
+        results = []
+        for turn in range(1, 6):
+            attempts = self.turn == turn
+            approved = attempts & self.approved
+            rate = self.approved[attempts].mean() if attempts.any() else float('nan')
+            sabotaged = (self.sabotages[approved] > 0).mean() if approved.any() else float('nan')
+            results.append((turn, int(attempts.sum()), float(rate), float(sabotaged)))
+        return results
+
+
+def show(games):
+    print("Loaded %i games with %i bots, %i attempts at missions." % (len(games), len(games.names), len(games.game)))
+
+    print("\nBOTS\t\t\tresistance\t\tspy")
+    for name, res, spy in sorted(games.bots(), key = lambda x: x[1][0], reverse = True):
+        print("  %-16s\t%5.1f%% (n=%i)\t%5.1f%% (n=%i)" % (name, 100.0 * res[0], res[1], 100.0 * spy[0], spy[1]))
+
+    print("\nMISSIONS\t\tattempts\tapproved\tsabotaged")
+    for turn, attempts, approved, sabotaged in games.missions():
+        print("  #%i\t\t\t%i\t\t%5.1f%%\t\t%5.1f%%" % (turn, attempts, 100.0 * approved, 100.0 * sabotaged))
+
+    print("\nCORRELATION WITH WINNING\tresistance\tspy")
+    won = games.won
+    for label, values in [("being selected", games.selected),
+                          ("being voted up", games.votedUp),
+                          ("selecting yourself", games.selfSelected),
+                          ("voting up own teams", games.votedOwn)]:
+        print("  %-24s\t%+.3f\t\t%+.3f" % (label, games.correlation(values, won, ~games.spy),
+                                          games.correlation(values, won, games.spy)))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print('USAGE: query.py games.rec')
+        sys.exit(-1)
+
+    show(Games.load(sys.argv[1]))
@@ -60,3 +60,53 @@ class Variable(object):
         self.samples += other.samples
         self.minimum = min(self.minimum, other.minimum)
         self.maximum = max(self.maximum, other.maximum)
+        return self
+
+
+class Latency(object):
+    """Distribution of the time taken by calls to a function, which tracks the
+    count, total and maximum exactly and the percentiles approximately, using a
+    histogram with four buckets per doubling of time starting at 1us.  These
+    can be accumulated across processes like variables."""
+
+    BUCKETS = 120
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.histogram = [0] * self.BUCKETS
+
+    def sample(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+        b = int(4.0 * math.log(seconds * 1.0e6, 2)) + 1 if seconds > 1.0e-6 else 0
+        self.histogram[min(b, self.BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket that contains this fraction of calls."""
+        threshold = fraction * self.count
+        current = 0
+        for b, n in enumerate(self.histogram):
+            current += n
+            if n and current >= threshold:
+                return min(self.maximum, 1.0e-6 * 2.0 ** (b / 4.0))
+        return self.maximum
+
+    def detail(self):
+        def ms(seconds):
+            return "{:8.3f}".format(seconds * 1000.0)
+        return "{:>8d} {:9.2f}s {} {} {}".format(
+            self.count, self.total, ms(self.percentile(0.5)), ms(self.percentile(0.99)), ms(self.maximum))
+
+    def __repr__(self):
+        return "<Latency n=%i total=%0.3fs>" % (self.count, self.total)
+
+    def __iadd__(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        return self